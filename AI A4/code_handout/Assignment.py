@@ -1,22 +1,102 @@
 import copy
+import heapq
 import itertools
+import math
+import multiprocessing
+import queue
+import random
+import sys
+from collections import deque, namedtuple, OrderedDict
+import time
+import tracemalloc
+
+
+# The options CSP.parallel_search runs side by side by default: as the
+# CSP is set up, two other variable orderings and backjumping with
+# restarts
+DEFAULT_PORTFOLIO = [{}, {"variable_ordering": "domwdeg"}, {"variable_ordering": "mrv", "value_ordering": "lcv"},
+                     {"use_trail": True, "conflict_directed": True, "restart_unit": 10, "seed": 0}]
 
 
 class CSP:
-    def __init__(self):
+    def __init__(self, use_trail=True, arc_consistency="ac3", variable_ordering="first", value_ordering="domain",
+                 conflict_directed=False, nogood_limit=1000, restart_unit=0, seed=None):
         # self.variables is a list of the variable names in the CSP
         self.variables = []
 
-        # self.domains[i] is a list of legal values for variable i
+        # self.domains[i] is a list of legal values for variable i. In
+        # the search a domain is an int bitset. Every value of the CSP
+        # gets one bit, self.value_bits[value], the same for all the
+        # variables, and self.values[k] is the value of bit k
         self.domains = {}
+        self.values = []
+        self.value_bits = {}
 
-        # self.constraints[i][j] is a list of legal value pairs for
-        # the variable pair (i, j)
+        # self.constraints[i][j] is a list of support bitmasks for the
+        # variable pair (i, j): element k has the bits of the values of j
+        # that are legal together with the value of bit k of i
         self.constraints = {}
 
-        # to count runtime
+        # self.all_different[g] is a list of variables that must all get
+        # different values, and self.groups[i] the g's variable i is in
+        self.all_different = []
+        self.groups = {}
+
+        # to count runtime, arc_revisions counts calls to revise and
+        # support_searches the values whose support had to be looked for
         self.backtrack_calls = 0
         self.backtrack_fails = 0
+        self.arc_revisions = 0
+        self.support_searches = 0
+        self.all_different_propagations = 0
+
+        # "ac3" or "ac2001". With "ac2001" revise remembers the last
+        # support found for every value in self.last_support[i][j] and
+        # only searches again when that one is gone
+        self.arc_consistency = arc_consistency
+        self.last_support = None
+
+        # With use_trail the search changes one 'assignment' in place and
+        # logs every change on self.trail, so a failed value is undone
+        # instead of every value getting a deep copy of the assignment
+        self.use_trail = use_trail
+        self.trail = None
+
+        # The strategies that pick the next variable and order its values,
+        # by name from VARIABLE_ORDERINGS/VALUE_ORDERINGS or as objects
+        if isinstance(variable_ordering, str):
+            variable_ordering = VARIABLE_ORDERINGS[variable_ordering]()
+        if isinstance(value_ordering, str):
+            value_ordering = VALUE_ORDERINGS[value_ordering]()
+        self.variable_ordering = variable_ordering
+        self.value_ordering = value_ordering
+
+        # With conflict_directed the search keeps for every variable the
+        # decision levels that explain the values it lost, as a bitset in
+        # self.reasons[var]. A failed variable jumps straight back to the
+        # last level of its conflict set instead of the one before it
+        # (conflict-directed backjumping), and the decisions of that set
+        # are recorded as a nogood, at most nogood_limit of them, oldest
+        # out first. With a restart_unit the search starts over after
+        # restart_unit times the next Luby number of fails, trying the
+        # values in a random order (from 'seed') and keeping the nogoods
+        if conflict_directed and not use_trail:
+            raise ValueError("conflict_directed needs use_trail")
+        self.conflict_directed = conflict_directed
+        self.nogood_limit = nogood_limit
+        self.restart_unit = restart_unit
+        self.random = random.Random(seed)
+        self.reasons = None
+        self.reason_trail = None
+        self.conflict_levels = 0
+        self.decisions = []
+        self.nogoods = OrderedDict()
+        self.nogood_index = {}
+        self.nogoods_learned = 0
+        self.nogood_prunings = 0
+        self.backjumps = 0
+        self.restarts = 0
+        self.restart_fails = 0
 
     def add_variable(self, name, domain):
         """Add a new variable to the CSP. 'name' is the variable name
@@ -25,6 +105,39 @@ class CSP:
         self.variables.append(name)
         self.domains[name] = list(domain)
         self.constraints[name] = {}
+        self.groups[name] = []
+        for value in self.domains[name]:
+            if value not in self.value_bits:
+                self.value_bits[value] = 1 << len(self.values)
+                self.values.append(value)
+
+    def copy_model(self, **options):
+        """A new CSP with the variables, domains and constraints of this
+        one, and its options except the ones in 'options' (keywords of
+        CSP). The lists of the model are shared, not copied, so the new
+        one should get its own domains before any are changed.
+        """
+        settings = dict(use_trail=self.use_trail, arc_consistency=self.arc_consistency,
+                        variable_ordering=type(self.variable_ordering)(),
+                        value_ordering=type(self.value_ordering)(), conflict_directed=self.conflict_directed,
+                        nogood_limit=self.nogood_limit, restart_unit=self.restart_unit)
+        settings.update(options)
+        csp = CSP(**settings)
+        csp.variables = self.variables
+        csp.domains = dict(self.domains)
+        csp.values = self.values
+        csp.value_bits = self.value_bits
+        csp.constraints = self.constraints
+        csp.all_different = self.all_different
+        csp.groups = self.groups
+        return csp
+
+    def domain_bits(self, var):
+        """The bitset of all the values in the domain of 'var'."""
+        domain = 0
+        for value in self.domains[var]:
+            domain |= self.value_bits[value]
+        return domain
 
     def get_all_possible_pairs(self, a, b):
         """Get a list of all possible pairs (as tuples) of the values in
@@ -56,37 +169,357 @@ class CSP:
         are supposed to be two-way connections!
         """
         if not j in self.constraints[i]:
-            # First, get a list of all possible pairs of values between variables i and j
-            self.constraints[i][j] = self.get_all_possible_pairs(self.domains[i], self.domains[j])
+            # First, every value of i supports every value of j
+            self.constraints[i][j] = [self.domain_bits(j)] * len(self.values)
 
-        # Next, filter this list of value pairs through the function
-        # 'filter_function', so that only the legal value pairs remain
-        self.constraints[i][j] = list(filter(lambda value_pair: filter_function(*value_pair), self.constraints[i][j]))
+        # Next, filter all the value pairs through the function
+        # 'filter_function', so that only the legal value pairs keep
+        # their bit. A second constraint on i -> j filters what the
+        # first one left, like the pair lists did. The lists can be
+        # shared between arcs (see add_all_different_constraint), so it
+        # filters a copy
+        supports = self.constraints[i][j] = list(self.constraints[i][j])
+        for valuei in self.domains[i]:
+            k = self.value_bits[valuei].bit_length() - 1
+            for valuej in self.domains[j]:
+                bit = self.value_bits[valuej]
+                if supports[k] & bit and not filter_function(valuei, valuej):
+                    supports[k] &= ~bit
 
-    def add_all_different_constraint(self, variables):
+    def add_all_different_constraint(self, variables, binary=False):
         """Add an Alldiff constraint between all of the variables in the
-        list 'variables'.
+        list 'variables'. It is kept as one global constraint that
+        'propagate_all_different' handles, with 'binary' it is split
+        into a != constraint for every pair of variables instead.
+        """
+        if binary:
+            # The != supports only depend on the two domains, so arcs
+            # with the same domains share one list instead of running
+            # the filter on every pair of values again
+            shared = {}
+            for (i, j) in self.get_all_possible_pairs(variables, variables):
+                if i == j:
+                    continue
+                key = (self.domain_bits(i), self.domain_bits(j))
+                if key not in shared:
+                    shared[key] = [key[1] & ~(1 << k) if key[0] >> k & 1 else key[1]
+                                   for k in range(len(self.values))]
+                if j in self.constraints[i]:
+                    self.constraints[i][j] = [a & b for a, b in zip(self.constraints[i][j], shared[key])]
+                else:
+                    self.constraints[i][j] = shared[key]
+            return
+        for var in variables:
+            self.groups[var].append(len(self.all_different))
+        self.all_different.append(list(variables))
+
+    def get_values(self, assignment):
+        """Turn the bitset domains of 'assignment' back into lists of
+        the values that are left, in the order of self.domains.
         """
-        for (i, j) in self.get_all_possible_pairs(variables, variables):
-            if i != j:
-                self.add_constraint_one_way(i, j, lambda x, y: x != y)
+        return dict((var, [value for value in self.domains[var] if domain & self.value_bits[value]])
+                    for var, domain in assignment.items())
+
+    def single_values(self, var, domain):
+        """The values left in 'domain' of 'var', each as a bitset of its
+        own, in the order they have in self.domains[var].
+        """
+        for value in self.domains[var]:
+            bit = self.value_bits[value]
+            if domain & bit:
+                yield bit
 
     def backtracking_search(self):
         """This functions starts the CSP solver and returns the found
-        solution.
+        solution, as a dictionary from every variable to a list with
+        its value.
         """
-        # Make a so-called "deep copy" of the dictionary containing the
-        # domains of the CSP variables. The deep copy is required to
-        # ensure that any changes made to 'assignment' does not have any
-        # side effects elsewhere.
-        assignment = copy.deepcopy(self.domains)
-
-        # Run AC-3 on all constraints in the CSP, to weed out all of the
-        # values that are not arc-consistent to begin with
-        self.inference(assignment, self.get_all_arcs())
+        assignment = self.start_search()
+        if assignment is None:
+            return False
 
         # Call backtrack with the partial assignment 'assignment'
-        return self.backtrack(assignment)
+        if self.conflict_directed:
+            solution = self.restart_search(assignment)
+        else:
+            solution = self.backtrack(assignment)
+        return self.get_values(solution) if solution else solution
+
+    def start_search(self):
+        """Set up a new search and return the assignment it starts from,
+        or None if AC-3 already finds there is no solution.
+        """
+        # Every variable starts with all of its values legal. The domains
+        # are ints, so copying the dictionary is already a "deep copy"
+        # and changes to 'assignment' have no side effects elsewhere.
+        assignment = dict((var, self.domain_bits(var)) for var in self.variables)
+        if self.use_trail:
+            self.trail = []
+        if self.arc_consistency == "ac2001":
+            self.last_support = dict((i, dict((j, [0] * len(self.values)) for j in self.constraints[i]))
+                                     for i in self.constraints)
+        if self.conflict_directed:
+            # Nothing explains a value lost before the first decision
+            self.reasons = dict.fromkeys(self.variables, 0)
+            self.reason_trail = []
+        self.variable_ordering.start(self, assignment)
+
+        # Run AC-3 on all constraints in the CSP, and the Alldiff
+        # propagation on all the groups, to weed out all of the values
+        # that are not consistent to begin with
+        if not self.inference(assignment, self.get_all_arcs(), self.variables):
+            return None
+        return assignment
+
+    def iter_solutions(self):
+        """Yield every solution of the CSP, one at a time as the search
+        finds them, as a tuple of the values of the variables in the
+        order of self.variables. Stopping early costs nothing more than
+        the search so far.
+        """
+        assignment = self.start_search()
+        if assignment is not None:
+            for solution in self.enumerate_solutions(assignment):
+                yield solution
+
+    def count_solutions(self, limit=None):
+        """The number of solutions, counted up to 'limit' if one is
+        given. count_solutions(limit=2) == 1 checks that a puzzle has
+        exactly one solution and stops at the second one.
+        """
+        count = 0
+        for _ in self.iter_solutions():
+            count += 1
+            if count == limit:
+                break
+        return count
+
+    def enumerate_solutions(self, assignment):
+        """'backtrack' that goes on after a solution: it yields it (as
+        iter_solutions does) and tries the next value. It always backtracks
+        chronologically, also with conflict_directed.
+        """
+        self.backtrack_calls = self.backtrack_calls + 1
+        var = self.select_unassigned_variable(assignment)
+        if var == "complete":
+            yield tuple(self.values[assignment[name].bit_length() - 1] for name in self.variables)
+            return
+
+        found = False
+        for value in self.order_domain_values(var, assignment):
+            if self.use_trail:
+                mark = len(self.trail)
+                self.set_domain(assignment, var, value)
+                branch = assignment
+            else:
+                branch = copy.copy(assignment)
+                branch[var] = value
+            if self.inference(branch, self.get_all_neighboring_arcs(var), [var]):
+                for solution in self.enumerate_solutions(branch):
+                    found = True
+                    yield solution
+            if self.use_trail:
+                self.undo(assignment, mark)
+        if not found:
+            self.backtrack_fails = self.backtrack_fails +1
+
+    def parallel_search(self, workers=None, mode="portfolio", portfolio=DEFAULT_PORTFOLIO):
+        """backtracking_search on 'workers' processes (all the cores by
+        default). With mode "portfolio" every worker solves the whole CSP
+        with its own options from 'portfolio' (a list of dicts of CSP
+        keywords). With mode "split" AC-3 runs here first, then every
+        value of the first variable to branch on is solved as its own
+        CSP. The first solution found wins and the other workers are
+        terminated. backtrack_calls/fails add up all the finished
+        workers, 'parallel_winner' says which one found the solution.
+        """
+        self.parallel_winner = None
+        if mode == "portfolio":
+            tasks = [(options, self.copy_model(**options)) for options in portfolio]
+        elif mode == "split":
+            assignment = self.start_search()
+            if assignment is None:
+                return False
+            var = self.select_unassigned_variable(assignment)
+            if var == "complete":
+                return self.get_values(assignment)
+            tasks = []
+            for value in self.order_domain_values(var, assignment):
+                branch = self.copy_model()
+                branch.domains = self.get_values(assignment)
+                branch.domains[var] = [self.values[value.bit_length() - 1]]
+                tasks.append(({var: branch.domains[var][0]}, branch))
+        else:
+            raise ValueError("Unknown parallel mode: %r" % (mode,))
+
+        pool = multiprocessing.Pool(workers)
+        try:
+            for label, solution, calls, fails in pool.imap_unordered(solve_csp_task, tasks):
+                self.backtrack_calls += calls
+                self.backtrack_fails += fails
+                if solution:
+                    self.parallel_winner = label
+                    return solution
+            return False
+        finally:
+            # The others may still be searching, they are stopped here
+            pool.terminate()
+            pool.join()
+
+    def restart_search(self, assignment):
+        """Run 'backtrack_conflict' from the top, and again from the top
+        every time it gives up to restart, until it has a solution or
+        proves there is none. Returns the solution or False.
+        """
+        mark, reason_mark = len(self.trail), len(self.reason_trail)
+        while True:
+            self.restart_fails = 0
+            result = self.backtrack_conflict(assignment, 1)
+            if result is not None:
+                return result if isinstance(result, dict) else False
+            self.restarts += 1
+            self.undo(assignment, mark)
+            self.undo_reasons(reason_mark)
+
+    def restart_limit(self):
+        """The fails allowed before the next restart, or None without
+        restarts.
+        """
+        if not self.restart_unit:
+            return None
+        return self.restart_unit * luby(self.restarts + 1)
+
+    def backtrack_conflict(self, assignment, level):
+        """'backtrack' with conflict-directed backjumping, for the
+        decision at 'level' (the first one is 1). Returns the solution,
+        None to restart, or else the conflict set of the failure: the
+        bitset of the earlier levels whose decisions together leave no
+        value for this variable. The levels in between that are not in
+        it return it straight away, they can't fix the failure.
+        """
+        self.backtrack_calls = self.backtrack_calls + 1
+        var = self.select_unassigned_variable(assignment)
+        if var == "complete":
+            return assignment
+
+        # The values 'var' lost before it got here were lost because of
+        # the levels in its reason
+        conflict = self.reasons[var]
+        values = self.order_domain_values(var, assignment)
+        if self.restart_unit:
+            self.random.shuffle(values)
+        for value in values:
+            mark, reason_mark = len(self.trail), len(self.reason_trail)
+            self.decisions.append((var, value))
+            self.set_domain(assignment, var, value)
+            self.explain(var, 1 << level)
+            pruned = self.check_nogoods(assignment, var, value)
+            if pruned is None:
+                result = self.conflict_levels
+            elif self.inference(assignment, [arc for pruned_var in pruned
+                                             for arc in self.get_all_neighboring_arcs(pruned_var)], pruned):
+                result = self.backtrack_conflict(assignment, level + 1)
+                if result is None or isinstance(result, dict):
+                    self.decisions.pop()
+                    if result is None:
+                        self.undo(assignment, mark)
+                        self.undo_reasons(reason_mark)
+                    return result
+            else:
+                result = self.conflict_levels
+            self.decisions.pop()
+            self.undo(assignment, mark)
+            self.undo_reasons(reason_mark)
+            if not result >> level & 1:
+                # This decision had no part in the failure, jump over it
+                self.backjumps += 1
+                return result
+            conflict |= result & ~(1 << level)
+
+        self.backtrack_fails = self.backtrack_fails +1
+        self.learn(conflict)
+        self.restart_fails += 1
+        limit = self.restart_limit()
+        if limit is not None and self.restart_fails >= limit and conflict:
+            return None
+        return conflict
+
+    def explain(self, var, levels):
+        """Add the decision levels 'levels' to the reason of 'var', on
+        the reason trail so that 'undo_reasons' can take them off.
+        """
+        reason = self.reasons[var]
+        if levels & ~reason:
+            self.reason_trail.append((var, reason))
+            self.reasons[var] = reason | levels
+
+    def undo_reasons(self, mark):
+        """Roll the reasons back to how they were when the reason trail
+        was 'mark' long.
+        """
+        while len(self.reason_trail) > mark:
+            var, reason = self.reason_trail.pop()
+            self.reasons[var] = reason
+
+    def learn(self, conflict):
+        """Record the decisions at the levels of 'conflict' as a nogood,
+        they can't all be made together. The nogood is a tuple of (var,
+        value bit) and 'nogood_index' finds it from any of them.
+        """
+        if not conflict or not self.nogood_limit:
+            return
+        nogood = []
+        while conflict:
+            level = conflict.bit_length() - 1
+            conflict ^= 1 << level
+            nogood.append(self.decisions[level - 1])
+        nogood = tuple(nogood)
+        if nogood in self.nogoods:
+            return
+        self.nogoods[nogood] = True
+        self.nogoods_learned += 1
+        for literal in nogood:
+            self.nogood_index.setdefault(literal, []).append(nogood)
+        if len(self.nogoods) > self.nogood_limit:
+            oldest, _ = self.nogoods.popitem(last=False)
+            for literal in oldest:
+                self.nogood_index[literal].remove(oldest)
+
+    def check_nogoods(self, assignment, var, value):
+        """Check the nogoods with the decision 'var' = 'value' in them.
+        When all of a nogood's other values are decided too it fails,
+        when all but one are, that one is taken from its variable.
+        Returns the variables whose domains changed, 'var' first, or
+        None on a failure, with its conflict set in conflict_levels.
+        """
+        changed = [var]
+        for nogood in self.nogood_index.get((var, value), ()):
+            levels = 0
+            open_literal = None
+            for literal in nogood:
+                other, bit = literal
+                domain = assignment[other]
+                if domain == bit:
+                    levels |= self.reasons[other]
+                elif not domain & bit or open_literal is not None:
+                    # Already kept, or two values open
+                    break
+                else:
+                    open_literal = literal
+            else:
+                if open_literal is None:
+                    self.conflict_levels = levels
+                    return None
+                other, bit = open_literal
+                self.nogood_prunings += 1
+                self.set_domain(assignment, other, assignment[other] & ~bit)
+                self.explain(other, levels)
+                if not assignment[other]:
+                    self.conflict_levels = self.reasons[other]
+                    return None
+                if other not in changed:
+                    changed.append(other)
+        return changed
 
     def backtrack(self, assignment):
         self.backtrack_calls = self.backtrack_calls + 1
@@ -95,15 +528,15 @@ class CSP:
 
         The function is called recursively, with a partial assignment of
         values 'assignment'. 'assignment' is a dictionary that contains
-        a list of all legal values for the variables that have *not* yet
-        been decided, and a list of only a single value for the
+        a bitset of all legal values for the variables that have *not*
+        yet been decided, and a bitset of only a single value for the
         variables that *have* been decided.
 
-        When all of the variables in 'assignment' have lists of length
-        one, i.e. when all variables have been assigned a value, the
-        function should return 'assignment'. Otherwise, the search
-        should continue. When the function 'inference' is called to run
-        the AC-3 algorithm, the lists of legal values in 'assignment'
+        When all of the variables in 'assignment' have one bit set, i.e.
+        when all variables have been assigned a value, the function
+        should return 'assignment'. Otherwise, the search should
+        continue. When the function 'inference' is called to run the
+        AC-3 algorithm, the bitsets of legal values in 'assignment'
         should get reduced as AC-3 discovers illegal values.
 
         IMPORTANT: For every iteration of the for-loop in the
@@ -121,11 +554,14 @@ class CSP:
         if var == "complete":
             return assignment
 
-        for value in assignment[var]:
-            assignment_copy = copy.deepcopy(assignment)
+        if self.use_trail:
+            return self.backtrack_trail(assignment, var)
+
+        for value in self.order_domain_values(var, assignment):
+            assignment_copy = copy.copy(assignment)
             assignment_copy[var] = value
             #We search for consistancy in the board from the case where the variable var is given the value value
-            inference = self.inference(assignment_copy, self.get_all_neighboring_arcs(var))
+            inference = self.inference(assignment_copy, self.get_all_neighboring_arcs(var), [var])
             #If true, uppdate the assignment with variable assigned the given value
             if inference:
                 # assignment_copy.update(inference)
@@ -136,68 +572,405 @@ class CSP:
         self.backtrack_fails = self.backtrack_fails +1
         return False
 
+    def backtrack_trail(self, assignment, var):
+        """The for-loop of 'backtrack' without the deep copies. Every
+        value is tried on 'assignment' itself, and everything 'inference'
+        removed is put back from the trail before the next value is tried,
+        so each value still starts from the same clean slate.
+        """
+        for value in self.order_domain_values(var, assignment):
+            mark = len(self.trail)
+            self.set_domain(assignment, var, value)
+            if self.inference(assignment, self.get_all_neighboring_arcs(var), [var]):
+                results = self.backtrack(assignment)
+                if results:
+                    return results
+            self.undo(assignment, mark)
+        self.backtrack_fails = self.backtrack_fails +1
+        return False
+
+    def undo(self, assignment, mark):
+        """Roll 'assignment' back to how it was when the trail was 'mark'
+        long. Every entry is a variable and the domain it had before it
+        was changed, they are undone last first.
+        """
+        while len(self.trail) > mark:
+            var, domain = self.trail.pop()
+            assignment[var] = domain
+            self.variable_ordering.changed(self, var, domain)
 
 
     def select_unassigned_variable(self, assignment):
         """The function 'Select-Unassigned-Variable' from the pseudocode
         in the textbook. Should return the name of one of the variables
-        in 'assignment' that have not yet been decided, i.e. whose list
-        of legal values has a length greater than one.
+        in 'assignment' that have not yet been decided, i.e. whose bitset
+        of legal values has more than one bit set.
         """
         # TODO: IMPLEMENT THIS
-        #Just selecting the first variable with more than one allowable value
-        for var in assignment:
-            if len(assignment[var]) > 1:
-                return var
-        return "complete"
+        # The variable_ordering strategy picks it, by default the first variable with more than one allowable value
+        return self.variable_ordering.select(self, assignment)
 
+    def order_domain_values(self, var, assignment):
+        """The values left for 'var', each as a bitset of one value, in
+        the order 'backtrack' should try them, which the value_ordering
+        strategy decides.
+        """
+        return self.value_ordering.order(self, var, assignment)
 
 
-    def inference(self, assignment, queue):
+    def inference(self, assignment, queue, changed=()):
         """The function 'AC-3' from the pseudocode in the textbook.
         'assignment' is the current partial assignment, that contains
-        the lists of legal values for each undecided variable. 'queue'
-        is the initial queue of arcs that should be visited.
+        the bitsets of legal values for each undecided variable. 'queue'
+        is the initial queue of arcs that should be visited, and
+        'changed' the variables whose domains changed, so the Alldiff
+        groups they are in have to be propagated again.
         """
         # TODO: IMPLEMENT THIS
         # queue is the partial assignent passed into inference, which consistent of all arcs of variables
         # which is connected to the current variable from "select_unnasigned_variable"
-        while len(queue) > 0:
-            var1, var2 = queue.pop(0)
-            # Check for consistency, if found append all connected varables to the queue again to see if
-            # some variables could be assigned with the new information
-            if self.revise(assignment, var1, var2):
-                if len(assignment[var1]) == 0:
+        # A deque pops from the front in O(1), and 'queued' keeps every arc in the queue at most once
+        queue = deque(queue)
+        queued = set(queue)
+        # The Alldiff groups waiting to be propagated, only done when there are no arcs left
+        groups = deque()
+        for var in changed:
+            for group in self.groups[var]:
+                if group not in groups:
+                    groups.append(group)
+        while queue or groups:
+            if queue:
+                arc = queue.popleft()
+                queued.discard(arc)
+                var1, var2 = arc
+                # Check for consistency, if found append all connected varables to the queue again to see if
+                # some variables could be assigned with the new information
+                if not self.revise(assignment, var1, var2):
+                    continue
+                if self.reasons is not None:
+                    self.explain(var1, self.reasons[var2])
+                if not assignment[var1]:
+                    if self.reasons is not None:
+                        self.conflict_levels = self.reasons[var1]
+                    self.variable_ordering.conflict(self, assignment, arc)
                     return False
+                changed = [var1]
+            else:
+                group = self.all_different[groups.popleft()]
+                changed = self.propagate_all_different(assignment, group)
+                if self.reasons is not None:
+                    # Whatever the group lost, all of its variables explain it
+                    levels = 0
+                    for var in group:
+                        levels |= self.reasons[var]
+                    if changed is None:
+                        self.conflict_levels = levels
+                    else:
+                        for var in changed:
+                            self.explain(var, levels)
+                if changed is None:
+                    self.variable_ordering.conflict(self, assignment, group)
+                    return False
+                var2 = None
+            for var1 in changed:
                 for neighboor in self.get_all_neighboring_arcs(var1):
-                    # Do not want to append itself.
-                    if neighboor != (var1, var2) and neighboor != (var1, var2):
-                        queue.append(neighboor)  
+                    # var2 lost no support because of the values var1 lost, they had none in var2
+                    if neighboor[0] != var2 and neighboor not in queued:
+                        queue.append(neighboor)
+                        queued.add(neighboor)
+                for group in self.groups[var1]:
+                    if group not in groups:
+                        groups.append(group)
         return True
 
+    def propagate_all_different(self, assignment, group):
+        """Propagation of one Alldiff constraint over the variables in
+        'group'. The values of the decided variables are removed from the
+        undecided ones, and if the variables together have fewer values
+        left than there are variables they can't all be different
+        (pigeonhole). When they have exactly as many values as there are
+        variables, like a Sudoku house, every value must be used, so a
+        value only one undecided variable can still take is given to it
+        (a hidden single). Returns the variables whose domains changed,
+        or None when the constraint can't be met.
+        """
+        self.all_different_propagations += 1
+        decided = 0
+        for var in group:
+            domain = assignment[var]
+            if not domain & (domain - 1):
+                if decided & domain:
+                    return None
+                decided |= domain
+        changed = []
+        # 'once' gets the values at least one undecided variable has, 'twice' the ones at least two have
+        once = twice = 0
+        for var in group:
+            domain = assignment[var]
+            if domain & (domain - 1):
+                if domain & decided:
+                    domain &= ~decided
+                    if not domain:
+                        return None
+                    changed.append(var)
+                    self.set_domain(assignment, var, domain)
+                twice |= once & domain
+                once |= domain
+        values = bin(once | decided).count("1")
+        if values < len(group):
+            return None
+        # With values to spare a value only one variable can take may also be left unused
+        hidden = once & ~twice if values == len(group) else 0
+        if hidden:
+            for var in group:
+                domain = assignment[var]
+                single = domain & hidden
+                if single and domain & (domain - 1):
+                    if single & (single - 1):
+                        # Two values only this variable can take
+                        return None
+                    if var not in changed:
+                        changed.append(var)
+                    self.set_domain(assignment, var, single)
+        return changed
+
+    def set_domain(self, assignment, var, domain):
+        # Every change of a domain in the search goes through the trail, when there is one, and the
+        # variable ordering keeps up with the changes then
+        if self.trail is not None:
+            self.trail.append((var, assignment[var]))
+            self.variable_ordering.changed(self, var, domain)
+        assignment[var] = domain
+
+    def neighbours(self, var):
+        """The variables that share a constraint with 'var'."""
+        neighbours = set(self.constraints[var])
+        for group in self.groups[var]:
+            neighbours.update(self.all_different[group])
+        neighbours.discard(var)
+        return neighbours
+
 
 
     def revise(self, assignment, vari, varj):
         """The function 'Revise' from the pseudocode in the textbook.
         'assignment' is the current partial assignment, that contains
-        the lists of legal values for each undecided variable. 'i' and
+        the bitsets of legal values for each undecided variable. 'i' and
         'j' specifies the arc that should be visited. If a value is
         found in variable i's domain that doesn't satisfy the constraint
-        between i and j, the value should be deleted from i's list of
+        between i and j, the value should be deleted from i's bitset of
         legal values in 'assignment'.
         """
         # TODO: IMPLEMENT THIS
-        revised = False
-        for valuei in assignment[vari]:
-            remove = True
-            for valuej in assignment[varj]:
-                if (valuei,valuej) in self.constraints[vari][varj]:
-                    remove = False
-                    break
-            if remove: 
-                assignment[vari].remove(valuei)
-                revised = True
-        return revised
+        self.arc_revisions += 1
+        supports = self.constraints[vari][varj]
+        domainj = assignment[varj]
+        domain = assignment[vari]
+        if self.last_support is not None:
+            domain = self.revise_last_support(domain, supports, domainj, self.last_support[vari][varj])
+        else:
+            # A value of i is supported if its support mask has any value
+            # left in j's domain
+            self.support_searches += bin(domain).count("1")
+            values = domain
+            while values:
+                value = values & -values
+                values ^= value
+                if not supports[value.bit_length() - 1] & domainj:
+                    domain ^= value
+        if domain == assignment[vari]:
+            return False
+        self.set_domain(assignment, vari, domain)
+        return True
+
+    def revise_last_support(self, domain, supports, domainj, last):
+        """The loop of 'revise' for AC-2001. 'last' has the last support
+        found for every value of i, as a bitset of one value of j. While
+        it is still in j's domain the value is supported without a
+        search. Else the next support is searched after it, going round
+        to the lowest values, since backtracking can put values below
+        the last support back. That way 'last' never has to be undone.
+        Returns what is left of 'domain'.
+        """
+        searches = 0
+        values = domain
+        while values:
+            value = values & -values
+            values ^= value
+            k = value.bit_length() - 1
+            if last[k] & domainj:
+                continue
+            searches += 1
+            candidates = supports[k] & domainj
+            if not candidates:
+                domain ^= value
+                continue
+            later = candidates & ~((last[k] << 1) - 1)
+            found = later or candidates
+            last[k] = found & -found
+        self.support_searches += searches
+        return domain
+
+
+def solve_csp_task(task):
+    """Run backtracking_search on the CSP in 'task', a (label, csp)
+    pair, in a worker of CSP.parallel_search. Returns the label, the
+    solution and the backtrack calls and fails.
+    """
+    label, csp = task
+    solution = csp.backtracking_search()
+    return label, solution, csp.backtrack_calls, csp.backtrack_fails
+
+
+def luby(i):
+    """The i'th number (from 1) of the Luby sequence 1, 1, 2, 1, 1, 2, 4,
+    1, 1, 2, 1, 1, 2, 4, 8, ... that the restarts follow.
+    """
+    while True:
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+        if i == (1 << k) - 1:
+            return 1 << (k - 1)
+        i -= (1 << (k - 1)) - 1
+
+
+class VariableOrdering:
+    """Picks the variable 'backtrack' decides next. This one takes the
+    first undecided variable, like select_unassigned_variable always
+    did. The CSP calls 'start' before the search, 'changed' for every
+    domain that changes while there is a trail and 'conflict' with the
+    variables of a constraint that just failed.
+    """
+    def start(self, csp, assignment):
+        pass
+
+    def changed(self, csp, var, domain):
+        pass
+
+    def conflict(self, csp, assignment, variables):
+        pass
+
+    def select(self, csp, assignment):
+        for var in assignment:
+            if assignment[var] & (assignment[var] - 1):
+                return var
+        return "complete"
+
+
+class KeyOrdering(VariableOrdering):
+    """Picks the undecided variable with the smallest 'key', ties go to
+    the first one in csp.variables. The variables are kept in a heap of
+    (key, position, var, version) that only gets a new entry for a
+    variable when its domain or key changes. An entry is stale once the
+    variable's version has moved on, and is only thrown away when it
+    gets to the top. Without a trail the assignment is copied for every
+    value and the heap can't follow it, then all variables are scanned.
+    """
+    def start(self, csp, assignment):
+        self.position = dict((var, k) for k, var in enumerate(csp.variables))
+        self.version = dict.fromkeys(csp.variables, 0)
+        self.heap = []
+        for var in csp.variables:
+            self.changed(csp, var, assignment[var])
+
+    def key(self, csp, var, domain):
+        raise NotImplementedError
+
+    def changed(self, csp, var, domain):
+        self.version[var] += 1
+        if domain & (domain - 1):
+            heapq.heappush(self.heap, (self.key(csp, var, domain), self.position[var], var, self.version[var]))
+            if len(self.heap) > 4 * len(self.version):
+                # Most of the entries are stale by then, without this a long search keeps growing the heap
+                self.heap = [entry for entry in self.heap if entry[3] == self.version[entry[2]]]
+                heapq.heapify(self.heap)
+
+    def select(self, csp, assignment):
+        if not csp.use_trail:
+            undecided = [var for var in csp.variables if assignment[var] & (assignment[var] - 1)]
+            if not undecided:
+                return "complete"
+            return min(undecided, key=lambda var: (self.key(csp, var, assignment[var]), self.position[var]))
+        heap = self.heap
+        while heap:
+            key, position, var, version = heap[0]
+            if version == self.version[var]:
+                return var
+            heapq.heappop(heap)
+        return "complete"
+
+
+class MinimumRemainingValues(KeyOrdering):
+    """MRV: the variable with the fewest values left, ties go to the one
+    with the most neighbours (the degree heuristic).
+    """
+    def start(self, csp, assignment):
+        self.degree = dict((var, len(csp.neighbours(var))) for var in csp.variables)
+        KeyOrdering.start(self, csp, assignment)
+
+    def key(self, csp, var, domain):
+        return (bin(domain).count("1"), -self.degree[var])
+
+
+class DomWDeg(KeyOrdering):
+    """dom/wdeg: the variable with the smallest domain size divided by
+    its weighted degree. Every constraint starts with weight one and
+    gets one more each time it fails, the weighted degree of a variable
+    is the sum of the weights of its constraints.
+    """
+    def start(self, csp, assignment):
+        self.weight = dict((var, len(csp.constraints[var]) + len(csp.groups[var])) for var in csp.variables)
+        KeyOrdering.start(self, csp, assignment)
+
+    def key(self, csp, var, domain):
+        # A variable without constraints can take any of its values, so it goes last
+        if not self.weight[var]:
+            return float("inf")
+        return bin(domain).count("1") / float(self.weight[var])
+
+    def conflict(self, csp, assignment, variables):
+        for var in variables:
+            self.weight[var] += 1
+            if csp.use_trail:
+                self.changed(csp, var, assignment[var])
+
+
+class ValueOrdering:
+    """Orders the values 'backtrack' tries for a variable, this one in
+    the order of csp.domains.
+    """
+    def order(self, csp, var, assignment):
+        return list(csp.single_values(var, assignment[var]))
+
+
+class LeastConstrainingValue(ValueOrdering):
+    """LCV: first the values that rule out the fewest values of the
+    undecided neighbours, ties in the order of csp.domains.
+    """
+    def order(self, csp, var, assignment):
+        values = list(csp.single_values(var, assignment[var]))
+        if len(values) < 2:
+            return values
+
+        def ruled_out(value):
+            supports_index = value.bit_length() - 1
+            count = 0
+            for j, supports in csp.constraints[var].items():
+                domain = assignment[j]
+                if domain & (domain - 1):
+                    count += bin(domain & ~supports[supports_index]).count("1")
+            for group in csp.groups[var]:
+                for j in csp.all_different[group]:
+                    domain = assignment[j]
+                    if j != var and domain & value and domain & (domain - 1):
+                        count += 1
+            return count
+        return sorted(values, key=ruled_out)
+
+
+VARIABLE_ORDERINGS = {"first": VariableOrdering, "mrv": MinimumRemainingValues, "domwdeg": DomWDeg}
+VALUE_ORDERINGS = {"domain": ValueOrdering, "lcv": LeastConstrainingValue}
 
 
 def create_map_coloring_csp():
@@ -218,71 +991,444 @@ def create_map_coloring_csp():
     return csp
 
 
-def create_sudoku_csp(filename):
+# The digits of the boards, the first n of them for an n x n board. 0 or
+# . is an empty cell
+SUDOKU_DIGITS = "123456789ABCDEFGHIJKLMNOP"
+
+
+def create_sudoku_csp(filename, use_trail=True, arc_consistency="ac3", binary=False, **options):
     """Instantiate a CSP representing the Sudoku board found in the text
-    file named 'filename' in the current directory.
+    file named 'filename' in the current directory. With 'binary' the
+    Alldiff constraints are split into binary ones, 'options' go to CSP.
     """
-    csp = CSP()
-    board = list(map(lambda x: x.strip(), open(filename, 'r')))
+    with open(filename, 'r') as f:
+        board = [line.strip() for line in f if line.strip()]
+    return create_sudoku_csp_from_board(board, use_trail, arc_consistency, binary, **options)
+
+
+def create_sudoku_csp_from_board(board, use_trail=True, arc_consistency="ac3", binary=False, **options):
+    """Instantiate a CSP representing the Sudoku 'board', a list of n
+    strings of n cells each, for n = 9, 16 or 25 (any square really).
+    The cells are digits from SUDOKU_DIGITS, with 0 for the empty ones.
+    Variable row * n + col is the cell at (row, col), its values are
+    the digits.
+    """
+    n = len(board)
+    box = math.isqrt(n)
+    if box * box != n or any(len(row) != n for row in board):
+        raise ValueError("Not an n x n Sudoku board with square boxes: %r" % (board,))
+    csp = CSP(use_trail, arc_consistency, **options)
 
-    for row in range(9):
-        for col in range(9):
-            if board[row][col] == '0':
-                csp.add_variable('%d-%d' % (row, col), list(map(str, range(1, 10))))
+    digits = list(SUDOKU_DIGITS[:n])
+    for row in range(n):
+        for col in range(n):
+            cell = board[row][col].upper()
+            if cell == '0' or cell == '.':
+                csp.add_variable(row * n + col, digits)
+            elif cell in digits:
+                csp.add_variable(row * n + col, [cell])
             else:
-                csp.add_variable('%d-%d' % (row, col), [board[row][col]])
-
-    for row in range(9):
-        csp.add_all_different_constraint(['%d-%d' % (row, col) for col in range(9)])
-    for col in range(9):
-        csp.add_all_different_constraint(['%d-%d' % (row, col) for row in range(9)])
-    for box_row in range(3):
-        for box_col in range(3):
-            cells = []
-            for row in range(box_row * 3, (box_row + 1) * 3):
-                for col in range(box_col * 3, (box_col + 1) * 3):
-                    cells.append('%d-%d' % (row, col))
-            csp.add_all_different_constraint(cells)
+                raise ValueError("Not a digit of a %d x %d board: %r" % (n, n, cell))
+
+    for row in range(n):
+        csp.add_all_different_constraint([row * n + col for col in range(n)], binary)
+    for col in range(n):
+        csp.add_all_different_constraint([row * n + col for row in range(n)], binary)
+    for box_row in range(0, n, box):
+        for box_col in range(0, n, box):
+            csp.add_all_different_constraint([row * n + col for row in range(box_row, box_row + box)
+                                              for col in range(box_col, box_col + box)], binary)
 
     return csp
 
 
+def generate_sudoku(n=9, holes=0.6, seed=None):
+    """A random n x n board in the format of create_sudoku_csp_from_board,
+    a solved board shuffled from the usual pattern with a 'holes' part of
+    the cells emptied. It always has a solution but can have more than one.
+    """
+    rng = random.Random(seed)
+    box = math.isqrt(n)
+    def shuffled():
+        # Rows (or columns) shuffled within their band, and the bands too
+        bands = rng.sample(range(box), box)
+        return [band * box + line for band in bands for line in rng.sample(range(box), box)]
+    rows, cols = shuffled(), shuffled()
+    digits = rng.sample(SUDOKU_DIGITS[:n], n)
+    board = [[digits[(box * (row % box) + row // box + col) % n] for col in cols] for row in rows]
+    for cell in rng.sample(range(n * n), int(holes * n * n)):
+        board[cell // n][cell % n] = '0'
+    return [''.join(row) for row in board]
+
+
 def print_sudoku_solution(solution):
     """Convert the representation of a Sudoku solution as returned from
     the method CSP.backtracking_search(), into a human readable
     representation.
     """
-    for row in range(9):
-        for col in range(9):
-            print(solution['%d-%d' % (row, col)][0], end=" "),
-            if col == 2 or col == 5:
-                print('|', end=" "),
-        print("")
-        if row == 2 or row == 5:
-            print('------+-------+------')
-
-
-#Solving using the implemented functions
-sudoku_easy = create_sudoku_csp("easy.txt")
-completed_sudoku_easy = sudoku_easy.backtracking_search()
-if completed_sudoku_easy != None:
-    print_sudoku_solution(completed_sudoku_easy)
-    print("\nCalls: ", sudoku_easy.backtrack_calls, "\nFails: ", sudoku_easy.backtrack_fails)
-
-sudoku_medium = create_sudoku_csp("medium.txt")
-completed_sudoku_medium = sudoku_medium.backtracking_search()
-if completed_sudoku_medium != None:
-    print_sudoku_solution(completed_sudoku_medium)
-    print("\nCalls: ", sudoku_medium.backtrack_calls, "\nFails: ", sudoku_medium.backtrack_fails)
-
-sudoku_hard = create_sudoku_csp("hard.txt")
-completed_sudoku_hard = sudoku_hard.backtracking_search()
-if completed_sudoku_hard != None:
-    print_sudoku_solution(completed_sudoku_hard)
-    print("\nCalls: ", sudoku_hard.backtrack_calls, "\nFails: ", sudoku_hard.backtrack_fails)
-
-sudoku_veryhard = create_sudoku_csp("veryhard.txt")
-completed_sudoku_veryhard = sudoku_veryhard.backtracking_search()
-if completed_sudoku_veryhard != None:
-    print_sudoku_solution(completed_sudoku_veryhard)
-    print("\nCalls: ", sudoku_veryhard.backtrack_calls, "\nFails: ", sudoku_veryhard.backtrack_fails)
\ No newline at end of file
+    n = math.isqrt(len(solution))
+    box = math.isqrt(n)
+    for row in range(n):
+        print(" | ".join(" ".join(solution[row * n + col][0] for col in range(box_col, box_col + box))
+                         for box_col in range(0, n, box)))
+        if row % box == box - 1 and row != n - 1:
+            print("+".join("-" * (2 * box + (0 if box_col in (0, n - box) else 1)) for box_col in range(0, n, box)))
+
+
+def read_puzzles(lines):
+    """Read Sudoku boards from 'lines', an open file or any other stream
+    of lines, as lists of n rows like create_sudoku_csp_from_board takes.
+    A board is either one line of all its 81, 256 or 625 cells or n lines
+    of n cells like easy.txt, with 0 or . for the empty cells. Blank lines
+    and lines starting with # are skipped. The boards are yielded as they are
+    read, so the stream can be longer than fits in memory.
+    """
+    rows = []
+    for line in lines:
+        line = line.strip().replace('.', '0')
+        if not line or line.startswith('#'):
+            continue
+        if len(line) in (81, 256, 625) and not rows:
+            n = math.isqrt(len(line))
+            yield [line[row * n:(row + 1) * n] for row in range(n)]
+        elif len(line) in (4, 9, 16, 25) and (not rows or len(line) == len(rows[0])):
+            rows.append(line)
+            if len(rows) == len(line):
+                yield rows
+                rows = []
+        else:
+            raise ValueError("Not a Sudoku row or board: %r" % line)
+    if rows:
+        raise ValueError("Board with only %d rows at the end" % len(rows))
+
+
+# What solve_puzzle returns for every board, 'solution' is the n * n
+# digits of the solved board or None when it has no solution
+SudokuResult = namedtuple("SudokuResult", ["index", "solution", "backtrack_calls", "backtrack_fails", "seconds"])
+
+
+def solve_puzzle(task):
+    """Solve one board, 'task' is (index, board, options) with the
+    options for CSP. Runs in the worker processes of solve_batch.
+    """
+    index, board, options = task
+    start = time.time()
+    csp = create_sudoku_csp_from_board(board, **options)
+    solution = csp.backtracking_search()
+    if solution:
+        solution = ''.join(solution[var][0] for var in range(len(solution)))
+    else:
+        solution = None
+    return SudokuResult(index, solution, csp.backtrack_calls, csp.backtrack_fails, time.time() - start)
+
+
+def solve_chunk(tasks):
+    """solve_puzzle for every task in the list 'tasks'."""
+    return [solve_puzzle(task) for task in tasks]
+
+
+def solve_batch(puzzles, workers=None, ordered=True, chunksize=4, window=None, **options):
+    """Solve all the boards from 'puzzles' (e.g. read_puzzles(f)) over a
+    pool of 'workers' processes, all the cores by default and in this
+    process for 0 or 1. The boards go to the pool 'chunksize' at a time,
+    and at most 'window' chunks (4 per process by default) are read from
+    'puzzles' ahead of the results. Yields a SudokuResult for every board
+    as soon as it is there, in the input order when 'ordered' and else in
+    the order they get solved. 'options' go to CSP.
+    """
+    tasks = ((index, board, options) for index, board in enumerate(puzzles))
+    if workers is not None and workers <= 1:
+        for task in tasks:
+            yield solve_puzzle(task)
+        return
+    if window is None:
+        window = 4 * (workers or multiprocessing.cpu_count())
+    pool = multiprocessing.Pool(workers)
+    # Pool.imap would have its feeder thread read all of 'puzzles' at once, so
+    # the chunks are submitted here, a new one for every one that is done
+    pending = deque()
+    done = queue.Queue()
+
+    def submit():
+        chunk = list(itertools.islice(tasks, chunksize))
+        if chunk:
+            if ordered:
+                pending.append(pool.apply_async(solve_chunk, (chunk,)))
+            else:
+                pending.append(pool.apply_async(solve_chunk, (chunk,), callback=done.put, error_callback=done.put))
+        return bool(chunk)
+
+    try:
+        while len(pending) < window and submit():
+            pass
+        while pending:
+            if ordered:
+                results = pending.popleft().get()
+            else:
+                results = done.get()
+                pending.pop()
+                if isinstance(results, BaseException):
+                    raise results
+            submit()
+            for result in results:
+                yield result
+    finally:
+        # Also when the caller stops reading early
+        pool.terminate()
+        pool.join()
+
+
+def run_batch(filenames, workers=None, ordered=True, out=sys.stdout, **options):
+    """Solve every board in the files 'filenames' ('-' reads stdin) with
+    solve_batch, print a line per board with its index, backtrack calls,
+    time and solution, and at the end the number of boards per second.
+    """
+    def puzzles():
+        for filename in filenames:
+            if filename == '-':
+                for board in read_puzzles(sys.stdin):
+                    yield board
+            else:
+                with open(filename, 'r') as f:
+                    for board in read_puzzles(f):
+                        yield board
+    start = time.time()
+    solved = count = 0
+    for result in solve_batch(puzzles(), workers, ordered, **options):
+        count += 1
+        solved += result.solution is not None
+        out.write("%d %d %.4f %s\n" % (result.index, result.backtrack_calls, result.seconds,
+                                       result.solution or "unsolvable"))
+    elapsed = time.time() - start
+    out.write("# %d boards, %d solved, %.3f s, %.1f boards/s\n" % (count, solved, elapsed,
+                                                                   count / elapsed if elapsed > 0 else 0.0))
+
+
+def benchmark_trail(filenames=("easy.txt", "medium.txt", "hard.txt", "veryhard.txt"), binary=True):
+    """Solve every board with the deep copies and with the trail, and
+    print the time, peak memory (from tracemalloc) and backtrack calls of
+    both, and if they found the same solution. By default on the binary
+    constraints, where the peak mostly comes from the AC-3 queue, not from
+    the copies. The global Alldiff leaves too little search to compare.
+    """
+    print("%-14s %-9s %9s %12s %7s %6s" % ("board", "mode", "seconds", "peak kB", "calls", "same"))
+    for filename in filenames:
+        solutions = []
+        for use_trail in (False, True):
+            csp = create_sudoku_csp(filename, use_trail, binary=binary)
+            start = time.time()
+            solution = csp.backtracking_search()
+            elapsed = time.time() - start
+            # tracemalloc slows everything down, so the memory is measured in a second run
+            csp = create_sudoku_csp(filename, use_trail, binary=binary)
+            tracemalloc.start()
+            csp.backtracking_search()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            solutions.append(solution)
+            print("%-14s %-9s %9.3f %12.1f %7d %6s" % (filename, "trail" if use_trail else "deepcopy", elapsed,
+                                                       peak / 1024.0, csp.backtrack_calls, solution == solutions[0]))
+
+
+def compare_arc_consistency(filenames=("easy.txt", "medium.txt", "hard.txt", "veryhard.txt"), binary=True):
+    """Solve every board with AC-3 and with AC-2001, and print the time,
+    backtrack calls, arc revisions and support searches of both. By
+    default on the binary constraints, the global Alldiff has no arcs.
+    """
+    print("%-14s %-7s %9s %7s %10s %10s" % ("board", "mode", "seconds", "calls", "revisions", "searches"))
+    for filename in filenames:
+        for arc_consistency in ("ac3", "ac2001"):
+            csp = create_sudoku_csp(filename, arc_consistency=arc_consistency, binary=binary)
+            start = time.time()
+            csp.backtracking_search()
+            print("%-14s %-7s %9.3f %7d %10d %10d" % (filename, arc_consistency, time.time() - start,
+                                                      csp.backtrack_calls, csp.arc_revisions, csp.support_searches))
+
+
+def compare_all_different(filenames=("easy.txt", "medium.txt", "hard.txt", "veryhard.txt")):
+    """Build and solve every board with the Alldiff constraints split
+    into binary ones and as global constraints, and print the build and
+    solve times, backtrack calls, arc revisions and Alldiff propagations.
+    """
+    print("%-14s %-7s %9s %9s %7s %10s %8s" % ("board", "alldiff", "build s", "solve s", "calls", "revisions",
+                                                "alldiff"))
+    for filename in filenames:
+        for binary in (True, False):
+            start = time.time()
+            csp = create_sudoku_csp(filename, binary=binary)
+            built = time.time()
+            csp.backtracking_search()
+            print("%-14s %-7s %9.3f %9.3f %7d %10d %8d" % (filename, "binary" if binary else "global", built - start,
+                                                          time.time() - built, csp.backtrack_calls,
+                                                          csp.arc_revisions, csp.all_different_propagations))
+
+
+def check_all_different(trials=500, seed=0):
+    """Check the global Alldiff against the binary one on small CSPs
+    whose groups have more values than variables, where a value only one
+    variable can take may stay unused. Starts with A in {1, 2, 3} and B
+    in {2, 3} (4 solutions), then random groups. Every CSP is solved and
+    counted both ways and the CSPs where they disagree are printed.
+    Returns how many there were.
+    """
+    rng = random.Random(seed)
+    cases = [{"A": [1, 2, 3], "B": [2, 3]}, {"A": [1, 2, 3, 4], "B": [3, 4]}]
+    for _ in range(trials):
+        size = rng.randint(2, 5)
+        values = list(range(1, size + rng.randint(1, 3)))
+        cases.append({"X%d" % i: sorted(rng.sample(values, rng.randint(1, len(values)))) for i in range(size)})
+    mismatches = 0
+    for domains in cases:
+        results = []
+        for binary in (True, False):
+            csp = CSP()
+            for var, domain in domains.items():
+                csp.add_variable(var, domain)
+            csp.add_all_different_constraint(list(domains), binary=binary)
+            results.append((bool(csp.backtracking_search()), csp.count_solutions()))
+        if results[0] != results[1]:
+            mismatches += 1
+            print(domains, "binary (solved, solutions) %s, global %s" % results)
+    print("%d of %d CSPs disagree" % (mismatches, len(cases)))
+    return mismatches
+
+
+def compare_orderings(filenames=("easy.txt", "medium.txt", "hard.txt", "veryhard.txt"), binary=True):
+    """Solve every board with every variable and value ordering, and print
+    the time, backtrack calls and fails. By default on the binary
+    constraints, with the global Alldiff these boards hardly need a search.
+    """
+    print("%-14s %-8s %-7s %9s %7s %7s" % ("board", "variable", "value", "seconds", "calls", "fails"))
+    for filename in filenames:
+        for variable_ordering in VARIABLE_ORDERINGS:
+            for value_ordering in VALUE_ORDERINGS:
+                csp = create_sudoku_csp(filename, binary=binary, variable_ordering=variable_ordering,
+                                        value_ordering=value_ordering)
+                start = time.time()
+                csp.backtracking_search()
+                print("%-14s %-8s %-7s %9.3f %7d %7d" % (filename, variable_ordering, value_ordering,
+                                                         time.time() - start, csp.backtrack_calls,
+                                                         csp.backtrack_fails))
+
+
+def benchmark_sizes(sizes=(9, 16, 25), holes=0.5, seed=0, binary=False, **options):
+    """Build and solve a generated board of every size in 'sizes', and
+    print the build time, the memory the built CSP takes (from
+    tracemalloc), the solve time and the backtrack calls. 'options' go
+    to CSP, e.g. variable_ordering="domwdeg" keeps the bigger boards fast.
+    """
+    print("%-5s %-7s %9s %12s %9s %7s %6s" % ("size", "alldiff", "build s", "memory kB", "solve s", "calls",
+                                              "solved"))
+    for n in sizes:
+        board = generate_sudoku(n, holes, seed)
+        start = time.time()
+        csp = create_sudoku_csp_from_board(board, binary=binary, **options)
+        built = time.time()
+        solution = csp.backtracking_search()
+        solved = time.time()
+        # tracemalloc slows everything down, so the memory is measured in a second build
+        tracemalloc.start()
+        memory_csp = create_sudoku_csp_from_board(board, binary=binary, **options)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del memory_csp
+        print("%-5s %-7s %9.3f %12.1f %9.3f %7d %6s" % ("%dx%d" % (n, n), "binary" if binary else "global",
+                                                        built - start, memory / 1024.0, solved - built,
+                                                        csp.backtrack_calls, bool(solution)))
+
+
+def compare_conflict_directed(filenames=("veryhard.txt",), generated=((9, 0.7, 0), (9, 0.75, 0)),
+                              binary=True, restart_unit=10, **options):
+    """Solve every board from 'filenames' and the (size, holes, seed)
+    boards from generate_sudoku in 'generated' with plain chronological
+    backtracking, with conflict-directed backjumping and nogoods, and
+    with Luby restarts on top, and print the time, backtrack calls and
+    fails, backjumps, learned nogoods and restarts. By default on the
+    binary constraints, the global Alldiff leaves too little search.
+    """
+    boards = []
+    for filename in filenames:
+        with open(filename, 'r') as f:
+            boards.append((filename, [line.strip() for line in f if line.strip()]))
+    for n, holes, seed in generated:
+        boards.append(("%dx%d %.2f #%d" % (n, n, holes, seed), generate_sudoku(n, holes, seed)))
+    modes = [("chronological", {}), ("backjumping", {"conflict_directed": True}),
+             ("restarts", {"conflict_directed": True, "restart_unit": restart_unit, "seed": 0})]
+    print("%-16s %-13s %9s %7s %7s %9s %8s %8s" % ("board", "mode", "seconds", "calls", "fails", "backjumps",
+                                                  "nogoods", "restarts"))
+    for name, board in boards:
+        for mode, mode_options in modes:
+            mode_options = dict(options, **mode_options)
+            csp = create_sudoku_csp_from_board(board, binary=binary, **mode_options)
+            start = time.time()
+            csp.backtracking_search()
+            print("%-16s %-13s %9.3f %7d %7d %9d %8d %8d" % (name, mode, time.time() - start, csp.backtrack_calls,
+                                                            csp.backtrack_fails, csp.backjumps,
+                                                            csp.nogoods_learned, csp.restarts))
+
+
+def compare_parallel(generated=((9, 0.75, 0), (9, 0.8, 1)), binary=True, workers=None):
+    """Solve generated boards with backtracking_search and with both
+    modes of parallel_search, and print the time, backtrack calls (of
+    all the workers together) and which worker won.
+    """
+    print("%-16s %-10s %9s %7s  %s" % ("board", "mode", "seconds", "calls", "winner"))
+    for n, holes, seed in generated:
+        board = generate_sudoku(n, holes, seed)
+        name = "%dx%d %.2f #%d" % (n, n, holes, seed)
+        for mode in ("serial", "portfolio", "split"):
+            csp = create_sudoku_csp_from_board(board, binary=binary)
+            start = time.time()
+            if mode == "serial":
+                csp.backtracking_search()
+                winner = None
+            else:
+                csp.parallel_search(workers, mode)
+                winner = csp.parallel_winner
+            print("%-16s %-10s %9.3f %7d  %s" % (name, mode, time.time() - start, csp.backtrack_calls, winner))
+
+
+if __name__ == "__main__":
+    # python3 Assignment.py solves the four boards here, with file names it
+    # solves every board in them in parallel (python3 Assignment.py --help)
+    import argparse
+    parser = argparse.ArgumentParser(description="Sudoku CSP solver")
+    parser.add_argument("files", nargs="*", help="files with boards, all cells on a line or a line per row, - for stdin")
+    parser.add_argument("--workers", type=int, default=None, help="processes to solve in, all the cores by default")
+    parser.add_argument("--unordered", action="store_true", help="print the boards as they get solved")
+    parser.add_argument("--variable-ordering", default="first", choices=sorted(VARIABLE_ORDERINGS))
+    parser.add_argument("--value-ordering", default="domain", choices=sorted(VALUE_ORDERINGS))
+    args = parser.parse_args()
+    if args.files:
+        run_batch(args.files, args.workers, not args.unordered, variable_ordering=args.variable_ordering,
+                  value_ordering=args.value_ordering)
+        sys.exit(0)
+
+    #Solving using the implemented functions, on the binary constraints so the revisions count AC-3's work
+    sudoku_easy = create_sudoku_csp("easy.txt", binary=True)
+    completed_sudoku_easy = sudoku_easy.backtracking_search()
+    if completed_sudoku_easy != None:
+        print_sudoku_solution(completed_sudoku_easy)
+        print("\nCalls: ", sudoku_easy.backtrack_calls, "\nFails: ", sudoku_easy.backtrack_fails,
+              "\nRevisions: ", sudoku_easy.arc_revisions)
+
+    sudoku_medium = create_sudoku_csp("medium.txt", binary=True)
+    completed_sudoku_medium = sudoku_medium.backtracking_search()
+    if completed_sudoku_medium != None:
+        print_sudoku_solution(completed_sudoku_medium)
+        print("\nCalls: ", sudoku_medium.backtrack_calls, "\nFails: ", sudoku_medium.backtrack_fails,
+              "\nRevisions: ", sudoku_medium.arc_revisions)
+
+    sudoku_hard = create_sudoku_csp("hard.txt", binary=True)
+    completed_sudoku_hard = sudoku_hard.backtracking_search()
+    if completed_sudoku_hard != None:
+        print_sudoku_solution(completed_sudoku_hard)
+        print("\nCalls: ", sudoku_hard.backtrack_calls, "\nFails: ", sudoku_hard.backtrack_fails,
+              "\nRevisions: ", sudoku_hard.arc_revisions)
+
+    sudoku_veryhard = create_sudoku_csp("veryhard.txt", binary=True)
+    completed_sudoku_veryhard = sudoku_veryhard.backtracking_search()
+    if completed_sudoku_veryhard != None:
+        print_sudoku_solution(completed_sudoku_veryhard)
+        print("\nCalls: ", sudoku_veryhard.backtrack_calls, "\nFails: ", sudoku_veryhard.backtrack_fails,
+              "\nRevisions: ", sudoku_veryhard.arc_revisions)
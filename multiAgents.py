@@ -13,12 +13,19 @@
 
 
 from util import manhattanDistance
-from game import Directions
-import random, util
+from game import Directions, Actions
+import random, util, time
+import os, hashlib
+import numpy as np
+import multiprocessing
 
 
 from game import Agent
 
+#The same as in pacman.py, evaluateActions works out Pacman's successors itself
+SCARED_TIME = 40
+COLLISION_TOLERANCE = 0.7
+
 class ReflexAgent(Agent):
     """
     A reflex agent chooses an action at each choice point by examining
@@ -42,8 +49,8 @@ class ReflexAgent(Agent):
         # Collect legal moves and successor states
         legalMoves = gameState.getLegalActions()
 
-        # Choose one of the best actions
-        scores = [self.evaluationFunction(gameState, action) for action in legalMoves]
+        # Choose one of the best actions, all the moves are scored together from one look at the state
+        scores = self.evaluateActions(gameState, legalMoves)
         bestScore = max(scores)
         bestIndices = [index for index in range(len(scores)) if scores[index] == bestScore]
         chosenIndex = random.choice(bestIndices) # Pick randomly among the best
@@ -75,7 +82,91 @@ class ReflexAgent(Agent):
         newScaredTimes = [ghostState.scaredTimer for ghostState in newGhostStates]
 
         "*** YOUR CODE HERE ***"
-        return successorGameState.getScore()
+        #Maze distances from the precomputed table, manhattan distance would walk through walls
+        maze = getMazeDistances(successorGameState)
+        foodDistances = [maze.getDistance(newPos, food) for food in newFood.asList()]
+        foodDistance = min(foodDistances) if foodDistances else None
+        ghosts = [(ghostState.getPosition(), scaredTime) for ghostState, scaredTime in zip(newGhostStates, newScaredTimes)]
+        return self.reflexScore(maze, newPos, successorGameState.getScore(), foodDistance, ghosts, action)
+
+    def reflexScore(self, maze, newPos, score, foodDistance, ghosts, action):
+        """
+        The score of moving to newPos, given the successor's game score, the maze
+        distance to the closest food left (None when there is none) and the
+        ghosts as (position, scaredTime) pairs.
+        """
+        if foodDistance is not None:
+            score -= foodDistance
+        for ghostPos, scaredTime in ghosts:
+            distance = maze.getDistance(newPos, ghostPos)
+            #Never walk next to a ghost that can eat us, but go for the scared ones we can reach in time
+            if scaredTime == 0 and distance <= 1:
+                score -= 500
+            elif scaredTime > distance:
+                score += 100.0 / (distance + 1)
+        if action == Directions.STOP:
+            score -= 5
+        return score
+
+    def evaluateActions(self, currentGameState, actions):
+        """
+        Scores all of actions together and returns the scores in the same order,
+        each the same as evaluationFunction(currentGameState, action) would give.
+
+        The food, capsules and ghosts are read once and no successor states are
+        generated, what a Pacman move does is worked out here from the rules in
+        pacman.py: a pellet is +10 (+500 for the last one), a capsule scares
+        every ghost, and walking into a ghost either eats it or loses the game.
+        The distances from all the new positions to all the food are one lookup
+        in the maze distance table.  Nothing is kept on the agent between calls,
+        so one agent can score moves for any number of games at the same time.
+        """
+        maze = getMazeDistances(currentGameState)
+        x, y = currentGameState.getPacmanPosition()
+        food = currentGameState.getFood()
+        foodList = food.asList()
+        capsules = currentGameState.getCapsules()
+        ghosts = [(ghostState.getPosition(), ghostState.start.getPosition(), ghostState.scaredTimer)
+                  for ghostState in currentGameState.getGhostStates()]
+        score = currentGameState.getScore()
+        newPositions = []
+        for action in actions:
+            dx, dy = Actions.directionToVector(action)
+            newPositions.append((int(x + dx), int(y + dy)))
+        if foodList:
+            foodColumn = dict((pos, column) for column, pos in enumerate(foodList))
+            foodDistances = maze.distances[np.ix_([maze.cellIndex(pos) for pos in newPositions],
+                                                  [maze.cellIndex(pos) for pos in foodList])]
+        scores = []
+        for row, (action, newPos) in enumerate(zip(actions, newPositions)):
+            newScore = score - 1
+            foodDistance = None
+            eats = food[newPos[0]][newPos[1]]
+            win = eats and len(foodList) == 1
+            if eats:
+                newScore += 10
+            if win:
+                newScore += 500
+            elif foodList:
+                distances = foodDistances[row]
+                if eats:
+                    distances = np.delete(distances, foodColumn[newPos])
+                foodDistance = int(distances.min())
+            scaredAll = newPos in capsules
+            newGhosts = []
+            for ghostPos, startPos, scaredTime in ghosts:
+                if scaredAll:
+                    scaredTime = SCARED_TIME
+                if manhattanDistance(ghostPos, newPos) <= COLLISION_TOLERANCE:
+                    if scaredTime > 0:
+                        #Eaten, it goes back to its start and stops being scared
+                        newScore += 200
+                        ghostPos, scaredTime = startPos, 0
+                    elif not win:
+                        newScore -= 500
+                newGhosts.append((ghostPos, scaredTime))
+            scores.append(self.reflexScore(maze, newPos, newScore, foodDistance, newGhosts, action))
+        return scores
 
 def scoreEvaluationFunction(currentGameState):
     """
@@ -87,6 +178,453 @@ def scoreEvaluationFunction(currentGameState):
     """
     return currentGameState.getScore()
 
+class TranspositionTable:
+    """
+    A size capped cache of already searched positions, shared by the minimax and
+    alpha-beta agents.  Each entry is [value, flag, action] where flag says if
+    the value is exact, or only a lower/upper bound because alpha-beta cut the
+    node off.
+
+    When the table is full the oldest entry is evicted (dicts keep insertion
+    order), except when the key is already stored, then it is just overwritten
+    since the newest search of a position is at least as good as the old one.
+    hits/misses are counted per move, totalHits/totalMisses for the whole game.
+    """
+    EXACT, LOWER, UPPER = 0, 1, 2
+
+    def __init__(self, maxSize = 100000):
+        self.maxSize = maxSize
+        self.table = {}
+        self.hits = self.misses = 0
+        self.totalHits = self.totalMisses = 0
+        self.evictions = 0
+
+    def newSearch(self):
+        self.totalHits += self.hits
+        self.totalMisses += self.misses
+        self.hits = self.misses = 0
+
+    def lookup(self, key):
+        entry = self.table.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def store(self, key, value, flag, action):
+        if key not in self.table and len(self.table) >= self.maxSize:
+            del self.table[next(iter(self.table))]
+            self.evictions += 1
+        self.table[key] = [value, flag, action]
+
+    def clear(self):
+        self.table.clear()
+
+    def __len__(self):
+        return len(self.table)
+
+class MoveOrdering:
+    """
+    Decides in which order AlphaBetaAgent.alphaBeta tries the legal moves of a
+    node, pick one with -a ordering=<class name> the same way as evalFn.  This
+    base class keeps the order the engine returns them in.
+
+    orderMoves gets called before a node is expanded, and recordCutoff every
+    time a move made the node prune its remaining siblings.
+    """
+    def newSearch(self, gameState):
+        pass
+
+    def orderMoves(self, gameState, agentIndex, ply, legalMoves):
+        return legalMoves
+
+    def recordCutoff(self, gameState, agentIndex, ply, depth, action):
+        pass
+
+class StaticOrdering(MoveOrdering):
+    """
+    Cheap ordering from the position alone.  Pacman tries the moves that eat a
+    pellet first and stopping last, the rest toward the food closest to him.
+    Ghosts try the moves toward pacman first (away from him while they are
+    scared).  Distances are manhattan, and the food used is the food at the
+    root, with the closest pellet cached per position.
+    """
+    def newSearch(self, gameState):
+        self.rootFood = gameState.getFood().asList()
+        self.nearestFood = {}
+
+    def staticScore(self, gameState, agentIndex, action):
+        #Lower is better, the last part is the distance left to the target after the move
+        dx, dy = Actions.directionToVector(action)
+        if agentIndex == 0:
+            x, y = gameState.getPacmanPosition()
+            if (x, y) not in self.nearestFood:
+                self.nearestFood[(x, y)] = min(self.rootFood, key = lambda food: manhattanDistance((x, y), food)) if self.rootFood else (x, y)
+            distance = manhattanDistance((x + dx, y + dy), self.nearestFood[(x, y)])
+            return (not gameState.hasFood(int(x + dx), int(y + dy)), action == Directions.STOP, distance)
+        ghostState = gameState.getGhostState(agentIndex)
+        x, y = ghostState.getPosition()
+        distance = manhattanDistance((x + dx, y + dy), gameState.getPacmanPosition())
+        if ghostState.scaredTimer > 0:
+            return (-distance,)
+        return (distance,)
+
+    def orderMoves(self, gameState, agentIndex, ply, legalMoves):
+        return sorted(legalMoves, key = lambda action: self.staticScore(gameState, agentIndex, action))
+
+class KillerHistoryOrdering(StaticOrdering):
+    """
+    Killer moves first (the last two moves that caused a cutoff on the same
+    ply), then the moves with the highest history score, with the static order
+    breaking ties.  The history table is keyed on (agentIndex, position, action)
+    and a cutoff adds depth*depth to it, it is halved every move so old games
+    don't dominate.
+    """
+    def __init__(self):
+        self.killers = {}
+        self.history = {}
+
+    def newSearch(self, gameState):
+        StaticOrdering.newSearch(self, gameState)
+        self.killers = {}
+        for key in self.history:
+            self.history[key] //= 2
+
+    def orderMoves(self, gameState, agentIndex, ply, legalMoves):
+        killers = self.killers.get(ply, ())
+        if agentIndex == 0:
+            pos = gameState.getPacmanPosition()
+        else:
+            pos = gameState.getGhostPosition(agentIndex)
+        def sortKey(action):
+            killerRank = killers.index(action) if action in killers else len(killers)
+            return (killerRank, -self.history.get((agentIndex, pos, action), 0), self.staticScore(gameState, agentIndex, action))
+        return sorted(legalMoves, key = sortKey)
+
+    def recordCutoff(self, gameState, agentIndex, ply, depth, action):
+        killers = self.killers.setdefault(ply, [])
+        if action not in killers:
+            killers.insert(0, action)
+            del killers[2:]
+        if agentIndex == 0:
+            pos = gameState.getPacmanPosition()
+        else:
+            pos = gameState.getGhostPosition(agentIndex)
+        self.history[(agentIndex, pos, action)] = self.history.get((agentIndex, pos, action), 0) + depth * depth
+
+class SearchProfiler:
+    """
+    Records what the searches of one agent cost.  Turned on with -a profile=1,
+    which keeps the records in agent.profiler, or -a profile=<file>, which also
+    appends them to the file at the end of every game, as CSV when the name
+    ends in .csv and as JSON lines otherwise.  So settings can be compared on
+    real games with e.g.
+
+    python3 pacman.py -p AlphaBetaAgent -a depth=3,ordering=StaticOrdering,profile=ab3.csv -n 10 -q
+
+    Every getAction gives a move record with the time it took, the depth
+    searched, the nodes expanded, cutoffs and transposition table hits/misses
+    (the agents own per move counters) and, per ply of the search tree, how
+    many nodes were expanded there and how many legal moves they had on
+    average (the branching factor).  At the end of a game its moves are summed
+    up in a game record.  An agent without a profiler only pays one
+    "is not None" check per node.
+    """
+    columns = ['record', 'agent', 'game', 'move', 'seconds', 'depth', 'nodes', 'cutoffs', 'ttHits', 'ttMisses',
+               'plyNodes', 'branching', 'moves', 'nodesPerSecond', 'score', 'win']
+
+    def __init__(self, path = None):
+        self.path = path
+        self.plies = {}
+        self.records = []
+        self.gameStart = 0
+        self.written = 0
+        self.numGames = 0
+
+    def expand(self, ply, numMoves):
+        #One node at ply expanded, it had numMoves legal moves
+        counts = self.plies.get(ply)
+        if counts is None:
+            self.plies[ply] = [1, numMoves]
+        else:
+            counts[0] += 1
+            counts[1] += numMoves
+
+    def takePlies(self):
+        plies, self.plies = self.plies, {}
+        return plies
+
+    def addPlies(self, plies):
+        #Counts from a worker process of a parallel search
+        for ply, (nodes, numMoves) in plies.items():
+            counts = self.plies.setdefault(ply, [0, 0])
+            counts[0] += nodes
+            counts[1] += numMoves
+
+    def recordMove(self, agent, seconds):
+        plies = self.takePlies()
+        numPlies = max(plies) + 1 if plies else 0
+        plyNodes = [plies.get(ply, [0, 0])[0] for ply in range(numPlies)]
+        branching = [round(float(plies[ply][1]) / plies[ply][0], 3) if ply in plies else 0.0 for ply in range(numPlies)]
+        table = agent.transpositionTable
+        self.records.append(dict(record = 'move', agent = agent.__class__.__name__, game = self.numGames,
+                                 move = len(self.records) - self.gameStart, seconds = seconds,
+                                 depth = agent.completedDepth if agent.timeLimit > 0 else agent.depth,
+                                 nodes = agent.nodesExpanded, cutoffs = agent.cutoffs,
+                                 ttHits = table.hits if table is not None else 0,
+                                 ttMisses = table.misses if table is not None else 0,
+                                 plyNodes = plyNodes, branching = branching))
+
+    def endGame(self, agent, state):
+        moves = self.records[self.gameStart:]
+        seconds = sum(move['seconds'] for move in moves)
+        nodes = sum(move['nodes'] for move in moves)
+        self.records.append(dict(record = 'game', agent = agent.__class__.__name__, game = self.numGames,
+                                 moves = len(moves), seconds = seconds, nodes = nodes,
+                                 cutoffs = sum(move['cutoffs'] for move in moves),
+                                 ttHits = sum(move['ttHits'] for move in moves),
+                                 ttMisses = sum(move['ttMisses'] for move in moves),
+                                 nodesPerSecond = nodes / seconds if seconds > 0 else 0.0,
+                                 score = state.getScore(), win = state.isWin()))
+        self.numGames += 1
+        self.gameStart = len(self.records)
+        if self.path is not None:
+            self.export(self.path, self.records[self.written:])
+            self.written = len(self.records)
+
+    def export(self, path, records = None):
+        """
+        Appends records (all of them by default) to path, as CSV if it ends in
+        .csv, with the per ply lists space separated, else as JSON lines.
+        """
+        import json, csv
+        if records is None:
+            records = self.records
+        if path.endswith('.csv'):
+            newFile = not os.path.exists(path) or os.path.getsize(path) == 0
+            with open(path, 'a') as f:
+                writer = csv.DictWriter(f, self.columns)
+                if newFile:
+                    writer.writeheader()
+                for record in records:
+                    writer.writerow(dict((name, ' '.join(map(str, value)) if isinstance(value, list) else value)
+                                         for name, value in record.items()))
+        else:
+            with open(path, 'a') as f:
+                for record in records:
+                    f.write(json.dumps(record) + '\n')
+
+class SearchTimeout(Exception):
+    """
+    Raised inside the search when the time budget of an anytime getAction is
+    used up, the unfinished iteration is thrown away.
+    """
+    pass
+
+#The agent each worker process of a parallel search runs the root subtrees with, and the alpha shared between them
+searchWorker = None
+sharedAlpha = None
+
+def initSearchWorker(agentClass, agentArgs, alpha):
+    global searchWorker, sharedAlpha
+    searchWorker = agentClass(**agentArgs)
+    searchWorker.alphaSource = sharedAlpha = alpha
+
+def searchRootAction(task):
+    """
+    Worker side of the parallel root split, searches the subtree below one root
+    action of pacman.  The search starts from the best exact root value any
+    worker has found so far as alpha, and raises it when this subtree beats it.
+    Alpha-beta reads it again at every pacman node of the subtree, so a better
+    value found by a sibling tightens the window of a search already running
+    (expectimax only reads it at the start, the alpha deeper down in Star1 is
+    relative to the chance node above).  Returns the value, the highest alpha
+    it was searched with (a value below it is only an upper bound), the number
+    of nodes expanded and cutoffs, and the per ply counts when profiling.
+    """
+    gameState, action = task
+    agent = searchWorker
+    agent.newSearch(gameState)
+    foodMask = agent.rootFoodMask(gameState) if agent.transpositionTable is not None else None
+    newGameState = gameState.generateSuccessor(0, action)
+    agent.alphaFloor = sharedAlpha.value
+    value = agent.rootChildValue(newGameState, agent.alphaFloor, agent.childFoodMask(0, newGameState, foodMask))
+    with sharedAlpha.get_lock():
+        if value > sharedAlpha.value:
+            sharedAlpha.value = value
+    plies = agent.profiler.takePlies() if agent.profiler is not None else None
+    return value, agent.alphaFloor, agent.nodesExpanded + 1, agent.cutoffs, plies
+
+#The order Actions.getPossibleActions lists the directions in, legal moves come out in the same order as from a GameState
+searchDirections = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST, Directions.STOP]
+
+class SearchLayout:
+    """
+    What SearchState needs to know about the walls: a bitboard of them (bit
+    x*height + y, like the food masks), and for every open cell the moves
+    pacman can make from it and the moves a ghost can make when it arrived
+    in a given direction, worked out once per layout.
+    """
+    __slots__ = ('width', 'height', 'walls', 'pacmanActions', 'ghostActions')
+
+    def __init__(self, walls):
+        self.width, self.height = walls.width, walls.height
+        self.walls = 0
+        self.pacmanActions = [None] * (self.width * self.height)
+        self.ghostActions = [None] * (self.width * self.height)
+        for x in range(self.width):
+            for y in range(self.height):
+                if walls[x][y]:
+                    self.walls |= 1 << (x * self.height + y)
+                    continue
+                possible = []
+                for direction in searchDirections:
+                    dx, dy = Actions.directionToVector(direction)
+                    if not walls[x + int(dx)][y + int(dy)]:
+                        possible.append(direction)
+                self.pacmanActions[x * self.height + y] = possible
+                #Ghosts can't stop, and can only turn back at a dead end
+                ghostActions = {}
+                for direction in searchDirections:
+                    legal = [action for action in possible if action != Directions.STOP]
+                    reverse = Actions.reverseDirection(direction)
+                    if reverse in legal and len(legal) > 1:
+                        legal.remove(reverse)
+                    ghostActions[direction] = legal
+                self.ghostActions[x * self.height + y] = ghostActions
+
+#The SearchLayout of the last walls grid seen, like lastMazeDistances
+lastSearchLayout = None
+
+def getSearchLayout(walls):
+    global lastSearchLayout
+    if lastSearchLayout is None or lastSearchLayout[0] is not walls:
+        lastSearchLayout = (walls, SearchLayout(walls))
+    return lastSearchLayout[1]
+
+class SearchState:
+    """
+    A light copy of a GameState to search on in place.  Food and capsules are
+    int bitboards, each agent is a tuple (x2, y2, direction, scaredTimer) with
+    the position doubled, since a scared ghost moves half a cell at a time.
+    make(agentIndex, action) plays a move with the same rules as pacman.py
+    (score, eating, capsules scaring the ghosts, collisions) and unmake() takes
+    the last one back, so searching a node copies a few ints and tuples
+    instead of a whole GameState.  Moves are the same Directions strings as
+    the GameState ones, so the action found is returned as it is.
+
+    The evaluation functions get the SearchState itself, it only has the
+    methods below, enough for scoreEvaluationFunction.  The agents check
+    their evalFn is in lightEvaluationFunctions when lightState is on.
+    """
+    __slots__ = ('layout', 'food', 'capsules', 'agents', 'starts', 'score', 'win', 'lose', 'trail')
+
+    def __init__(self, gameState):
+        self.layout = getSearchLayout(gameState.getWalls())
+        height = self.layout.height
+        self.food = 0
+        for x, y in gameState.getFood().asList():
+            self.food |= 1 << (x * height + y)
+        self.capsules = 0
+        for x, y in gameState.getCapsules():
+            self.capsules |= 1 << (x * height + y)
+        self.agents = []
+        self.starts = []
+        for agentState in [gameState.getPacmanState()] + gameState.getGhostStates():
+            x, y = agentState.getPosition()
+            self.agents.append((int(round(2 * x)), int(round(2 * y)), agentState.getDirection(), agentState.scaredTimer))
+            x, y = agentState.start.getPosition()
+            self.starts.append((int(round(2 * x)), int(round(2 * y)), agentState.start.getDirection(), 0))
+        self.score = gameState.getScore()
+        self.win, self.lose = gameState.isWin(), gameState.isLose()
+        self.trail = []
+
+    def getLegalActions(self, agentIndex = 0):
+        x2, y2, direction, scaredTimer = self.agents[agentIndex]
+        if (x2 | y2) & 1:
+            #Between two cells, the agent has to keep going
+            return [direction]
+        cell = (x2 >> 1) * self.layout.height + (y2 >> 1)
+        if agentIndex == 0:
+            return self.layout.pacmanActions[cell]
+        return self.layout.ghostActions[cell][direction]
+
+    def make(self, agentIndex, action):
+        agents = self.agents
+        self.trail.append((agents[:], self.food, self.capsules, self.score, self.win, self.lose))
+        x2, y2, direction, scaredTimer = agents[agentIndex]
+        dx, dy = Actions.directionToVector(action)
+        if agentIndex == 0:
+            x2, y2 = x2 + 2 * int(dx), y2 + 2 * int(dy)
+            if action != Directions.STOP:
+                direction = action
+            agents[0] = (x2, y2, direction, scaredTimer)
+            self.score -= 1
+            bit = 1 << ((x2 >> 1) * self.layout.height + (y2 >> 1))
+            if self.food & bit:
+                self.score += 10
+                self.food &= ~bit
+                if not self.food:
+                    self.score += 500
+                    self.win = True
+            if self.capsules & bit:
+                self.capsules &= ~bit
+                for index in range(1, len(agents)):
+                    gx2, gy2, ghostDirection, ghostTimer = agents[index]
+                    agents[index] = (gx2, gy2, ghostDirection, SCARED_TIME)
+            for index in range(1, len(agents)):
+                self.checkCollision(index)
+        else:
+            #Scared ghosts move at half speed, which is one step in doubled coordinates
+            step = 1 if scaredTimer > 0 else 2
+            x2, y2 = x2 + step * int(dx), y2 + step * int(dy)
+            if scaredTimer == 1:
+                #Back on a whole cell when it stops being scared
+                x2, y2 = (x2 + 1) >> 1 << 1, (y2 + 1) >> 1 << 1
+            agents[agentIndex] = (x2, y2, action, max(0, scaredTimer - 1))
+            self.checkCollision(agentIndex)
+
+    def checkCollision(self, index):
+        agents = self.agents
+        x2, y2 = agents[0][0], agents[0][1]
+        gx2, gy2, direction, scaredTimer = agents[index]
+        #COLLISION_TOLERANCE is 0.7 cells, 1.4 doubled
+        if abs(gx2 - x2) + abs(gy2 - y2) <= 2 * COLLISION_TOLERANCE:
+            if scaredTimer > 0:
+                self.score += 200
+                agents[index] = self.starts[index]
+            elif not self.win:
+                self.score -= 500
+                self.lose = True
+
+    def unmake(self):
+        self.agents, self.food, self.capsules, self.score, self.win, self.lose = self.trail.pop()
+
+    def getScore(self):
+        return float(self.score)
+
+    def isWin(self):
+        return self.win
+
+    def isLose(self):
+        return self.lose
+
+    def getNumAgents(self):
+        return len(self.agents)
+
+    def getPacmanPosition(self):
+        return (self.agents[0][0] >> 1, self.agents[0][1] >> 1)
+
+    def getGhostPositions(self):
+        return [(x2 / 2.0, y2 / 2.0) for x2, y2, direction, scaredTimer in self.agents[1:]]
+
+    def getNumFood(self):
+        return bin(self.food).count('1')
+
+#The evaluation functions that only use the methods a SearchState has
+lightEvaluationFunctions = [scoreEvaluationFunction]
+
 class MultiAgentSearchAgent(Agent):
     """
     This class provides some common elements to all of your
@@ -102,66 +640,402 @@ class MultiAgentSearchAgent(Agent):
     is another abstract class.
     """
 
-    def __init__(self, evalFn = 'scoreEvaluationFunction', depth = '2'):
+    def __init__(self, evalFn = 'scoreEvaluationFunction', depth = '2', ttSize = '0', timeLimit = '0',
+                 ordering = 'MoveOrdering', workers = '0', profile = '0', lightState = '0'):
         self.index = 0 # Pacman is always agent index 0
+        #Kept so the worker processes of a parallel search can build the same agent, they only profile in memory
+        self.agentArgs = dict(evalFn = evalFn, depth = depth, ttSize = ttSize, timeLimit = timeLimit, ordering = ordering,
+                              profile = '0' if profile == '0' else '1', lightState = lightState)
         self.evaluationFunction = util.lookup(evalFn, globals())
+        #Evaluation functions with a batch attribute score all the leaves below the last ghost in one call
+        self.batchEvaluation = getattr(self.evaluationFunction, 'batch', None)
         self.depth = int(depth)     
+        #The transposition table is opt-in (-a ttSize=100000), the autograder trees have no positions to hash
+        self.transpositionTable = TranspositionTable(int(ttSize)) if int(ttSize) > 0 else None
+        #With a time limit in seconds (-a timeLimit=0.2) getAction deepens 1, 2, 3... instead of using depth
+        self.timeLimit = float(timeLimit)
+        self.deadline = None
+        self.searchDepth = self.depth
+        self.completedDepth = 0
+        self.depthLimitReached = False
+        #Principal variation from the last finished iteration, pvTable is only set while deepening
+        self.principalVariation = []
+        self.pvTable = None
+        self.followPV = False
+        #Move ordering for alpha-beta, and counters of generateSuccessor calls and cutoffs to measure it by
+        self.moveOrdering = util.lookup(ordering, globals())()
+        self.nodesExpanded = self.cutoffs = 0
+        self.totalNodesExpanded = self.totalCutoffs = 0
+        #With workers > 0 (-a workers=4) the root actions are searched in that many processes, fixed depth only.
+        #prunes says if the search below the root can use an alpha from the root
+        self.workers = int(workers)
+        if self.workers > 0 and self.timeLimit > 0:
+            raise ValueError('workers can not be used with timeLimit, the parallel search runs at a fixed depth')
+        self.prunes = False
+        self.pool = None
+        #In a worker alphaSource is the shared alpha, and alphaFloor the highest value of it the search has used
+        self.alphaSource = None
+        self.alphaFloor = -2**16
+        #With lightState=1 minimax and alpha-beta search a SearchState with make/unmake instead of GameState
+        #successors, at fixed depth and without the table, ordering or workers
+        self.lightState = bool(int(lightState))
+        if self.lightState:
+            self.checkLightState(evalFn, ordering)
+        #Opt-in search statistics (-a profile=1 or profile=<file>), see SearchProfiler
+        self.profiler = None
+        if profile != '0':
+            self.profiler = SearchProfiler(None if profile == '1' else profile)
+            self.searchAction = self.getAction
+            self.getAction = self.profiledAction
+
+    def checkLightState(self, evalFn, ordering):
+        #Turns down the options the search on a SearchState has no support for, before the game starts
+        if self.evaluationFunction not in lightEvaluationFunctions:
+            raise ValueError('lightState=1 can not be used with evalFn=%s, a SearchState only has the methods '
+                             'scoreEvaluationFunction needs' % evalFn)
+        unsupported = [name for name, used in (('ttSize', self.transpositionTable is not None),
+                                               ('timeLimit', self.timeLimit > 0), ('ordering', ordering != 'MoveOrdering'),
+                                               ('workers', self.workers > 0)) if used]
+        if unsupported:
+            raise ValueError('lightState=1 can not be used with %s' % ', '.join(unsupported))
+
+    def profiledAction(self, gameState):
+        #Stands in for getAction when profiling, times the search and records its counters
+        start = time.time()
+        action = self.searchAction(gameState)
+        self.profiler.recordMove(self, time.time() - start)
+        return action
+
+    def profileNode(self, depth, agentIndex, numAgents, numMoves):
+        self.profiler.expand((self.searchDepth - depth) * numAgents + agentIndex, numMoves)
+
+    def rootFoodMask(self, gameState):
+        """
+        Packs the food grid into a single int, with bit x*height + y set for every
+        pellet left.  Only done once per getAction, the children update it in
+        childFoodMask.
+        """
+        food = gameState.getFood()
+        self.gridHeight = food.height
+        foodMask = 0
+        for x, y in food.asList():
+            foodMask |= 1 << (x * food.height + y)
+        return foodMask
+
+    def childFoodMask(self, agentIndex, newGameState, foodMask):
+        #Only pacman eats, so ghost moves keep the parents mask
+        if agentIndex != 0 or not foodMask:
+            return foodMask
+        x, y = newGameState.getPacmanPosition()
+        return foodMask & ~(1 << (x * self.gridHeight + y))
+
+    def stateKey(self, gameState, agentIndex, depth, foodMask):
+        """
+        The transposition table key.  Ghost directions are part of it because a
+        ghost is not allowed to reverse, so they change the legal moves below, and
+        the score is part of it since the evaluation functions read it.
+        """
+        ghosts = tuple((ghost.getPosition(), ghost.getDirection(), ghost.scaredTimer)
+                       for ghost in gameState.getGhostStates())
+        return (gameState.getPacmanPosition(), ghosts, foodMask, tuple(gameState.getCapsules()),
+                gameState.getScore(), agentIndex, depth)
+
+    def leafValues(self, gameState, agentIndex, numAgents, legalMoves):
+        """
+        Generates the children of a node when they are all leaves and evaluates
+        them with one call to the batch evaluation.
+        """
+        children = [gameState.generateSuccessor(agentIndex, action) for action in legalMoves]
+        self.nodesExpanded += len(children)
+        if self.pvTable is not None:
+            self.enterNode(0, 0, numAgents)
+            self.depthLimitReached = True
+        return self.batchEvaluation(children)
+
+    def probeTable(self, key, alpha, beta):
+        """
+        Looks up key in the transposition table, and returns the stored [value,
+        action] if it settles the node for the window (alpha, beta), else None.
+        """
+        entry = self.transpositionTable.lookup(key)
+        if entry is not None:
+            value, flag, action = entry
+            #A bound is only good enough if it is already outside the window we search with. The pruning is
+            #strict (> beta, < alpha), so a value equal to alpha or beta counts as exact and must be one
+            if flag == TranspositionTable.EXACT or (flag == TranspositionTable.LOWER and value > beta) or \
+               (flag == TranspositionTable.UPPER and value < alpha):
+                return [value, action]
+        return None
+
+    def raiseAlpha(self, alpha):
+        #Tightens the window of a worker to the best root value the other workers have found so far
+        shared = self.alphaSource.value
+        if shared > self.alphaFloor:
+            self.alphaFloor = shared
+        return max(alpha, self.alphaFloor)
+
+    def storeTable(self, key, best_move, alpha, beta):
+        #alpha and beta are the window the node was searched with
+        if best_move[0] < alpha:
+            flag = TranspositionTable.UPPER
+        elif best_move[0] > beta:
+            flag = TranspositionTable.LOWER
+        else:
+            flag = TranspositionTable.EXACT
+        self.transpositionTable.store(key, best_move[0], flag, best_move[1])
+
+    def newSearch(self, gameState):
+        #Called at the start of every getAction so the counters are per move
+        if self.transpositionTable is not None:
+            self.transpositionTable.newSearch()
+        self.moveOrdering.newSearch(gameState)
+        self.totalNodesExpanded += self.nodesExpanded
+        self.totalCutoffs += self.cutoffs
+        self.nodesExpanded = self.cutoffs = 0
+
+    def parallelSearch(self, gameState, foodMask):
+        """
+        Root split over a process pool.  The root actions are ordered like the
+        serial search would, and for the agents that prune the first one (the
+        eldest brother) is searched here with the full window, the rest in the
+        pool with the best value so far as alpha, which the alpha-beta workers
+        keep reading while they search.  A subtree that returns less than the
+        highest alpha it was searched with can't be the best one, the others are
+        exact, so
+        taking the first action with the highest value gives the same move as
+        the serial search.  (With KillerHistoryOrdering the root order depends
+        on what the workers learned, so there it can pick another move of equal
+        value.)
+        """
+        if self.pool is None:
+            self.sharedAlpha = multiprocessing.Value('d', -2**16)
+            self.pool = multiprocessing.Pool(self.workers, initializer = initSearchWorker,
+                                             initargs = (self.__class__, self.agentArgs, self.sharedAlpha))
+        legalMoves = self.moveOrdering.orderMoves(gameState, 0, 0, gameState.getLegalActions(0))
+        if self.profiler is not None:
+            self.profiler.expand(0, len(legalMoves))
+        results, alpha = [], -2**16
+        if self.prunes:
+            #Young brothers wait, the alpha for the rest comes from the eldest
+            newGameState = gameState.generateSuccessor(0, legalMoves[0])
+            self.nodesExpanded += 1
+            alpha = self.rootChildValue(newGameState, -2**16, self.childFoodMask(0, newGameState, foodMask))
+            results.append((alpha, -2**16, 0, 0, None))
+        with self.sharedAlpha.get_lock():
+            self.sharedAlpha.value = alpha
+        results += self.pool.map(searchRootAction, [(gameState, action) for action in legalMoves[len(results):]], chunksize = 1)
+        maxEval, corresponding_action = -2**16, None
+        for action, (value, alpha, nodes, cutoffs, plies) in zip(legalMoves, results):
+            self.nodesExpanded += nodes
+            self.cutoffs += cutoffs
+            if plies is not None:
+                self.profiler.addPlies(plies)
+            if value >= alpha and value > maxEval:
+                maxEval, corresponding_action = value, action
+        return corresponding_action
+
+    def lightSearch(self, state, depth, agentIndex, alpha, beta):
+        """
+        minmax, or alphaBeta for the agents that prune, on a SearchState.  Every
+        child is made, searched and unmade on the same state.  Returns [value,
+        action] like them, with the same values and tie breaking.
+        """
+        if state.win or state.lose or depth == 0:
+            return [self.evaluationFunction(state), None]
+        numAgents = len(state.agents)
+        legalMoves = state.getLegalActions(agentIndex)
+        if self.profiler is not None:
+            self.profileNode(depth, agentIndex, numAgents, len(legalMoves))
+        if agentIndex == 0:
+            maxEval, corresponding_action = -2**16, None
+            for action in legalMoves:
+                state.make(0, action)
+                self.nodesExpanded += 1
+                value = self.lightSearch(state, depth, 1, alpha, beta)[0]
+                state.unmake()
+                if maxEval < value:
+                    maxEval, corresponding_action = value, action
+                if self.prunes:
+                    if maxEval > beta:
+                        self.cutoffs += 1
+                        break
+                    alpha = max(alpha, maxEval)
+            return [maxEval, corresponding_action]
+        nextDepth, nextAgent = depth, agentIndex + 1
+        if nextAgent == numAgents:
+            nextDepth, nextAgent = depth - 1, 0
+        minEval, corresponding_action = 2**16, None
+        for action in legalMoves:
+            state.make(agentIndex, action)
+            self.nodesExpanded += 1
+            value = self.lightSearch(state, nextDepth, nextAgent, alpha, beta)[0]
+            state.unmake()
+            if minEval > value:
+                minEval, corresponding_action = value, action
+            if self.prunes:
+                if minEval < alpha:
+                    self.cutoffs += 1
+                    break
+                beta = min(beta, minEval)
+        return [minEval, corresponding_action]
+
+    def final(self, state):
+        #Called by the game when it is over, shuts the worker processes down and finishes the game's statistics
+        if self.profiler is not None and state is not None:
+            self.profiler.endGame(self, state)
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+
+    def iterativeDeepening(self, search):
+        """
+        Anytime search: calls search(depth) for depth 1, 2, 3... until
+        self.timeLimit seconds have passed, and returns the action from the
+        deepest iteration that finished.  The first iteration always runs to
+        the end so there is a move to return.  Stops early if an iteration
+        never hit the depth limit, since then every line ended in a win or loss
+        and searching deeper gives the same answer.
+        """
+        start = time.time()
+        self.principalVariation = []
+        best_move = None
+        depth = 0
+        try:
+            while True:
+                depth += 1
+                self.searchDepth = depth
+                self.pvTable = {}
+                self.followPV = True
+                self.depthLimitReached = False
+                best_move = search(depth)
+                self.completedDepth = depth
+                self.principalVariation = self.pvTable.get(0, [])
+                if not self.depthLimitReached:
+                    break
+                self.deadline = start + self.timeLimit
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = None
+            self.pvTable = None
+            self.searchDepth = self.depth
+        return best_move[1]
+
+    def enterNode(self, depth, agentIndex, numAgents):
+        """
+        Bookkeeping done on entry to every node while deepening: the time check,
+        and clearing this ply's line in the triangular pv table.
+        """
+        if self.deadline is not None and time.time() > self.deadline:
+            raise SearchTimeout()
+        ply = (self.searchDepth - depth) * numAgents + agentIndex
+        self.pvTable[ply] = []
+        return ply
+
+    def updatePV(self, depth, agentIndex, numAgents, action):
+        #The line of this node is the new best action followed by the line of the child
+        ply = (self.searchDepth - depth) * numAgents + agentIndex
+        self.pvTable[ply] = [action] + self.pvTable.get(ply + 1, [])
+
+    def orderPV(self, ply, legalMoves):
+        """
+        Puts the move of the last iterations principal variation first, as long
+        as we are still following that line from the root.
+        """
+        if ply < len(self.principalVariation) and self.principalVariation[ply] in legalMoves:
+            pvMove = self.principalVariation[ply]
+            return [pvMove] + [action for action in legalMoves if action != pvMove]
+        self.followPV = False
+        return legalMoves
 
 class MinimaxAgent(MultiAgentSearchAgent):
     """
     Your minimax agent (question 2)
     """
-    def minmax(self, depth,agentIndex,gameState,maximAgent = 0):
+    def minmax(self, depth,agentIndex,gameState,maximAgent = 0, foodMask = None):
         numAgents = gameState.getNumAgents()
+        if self.pvTable is not None:
+            ply = self.enterNode(depth, agentIndex, numAgents)
         #If the gamestate is winning, loosing or the depth is zero we don't create new branches, but we to static evaluations instead
         if gameState.isLose() or gameState.isWin() or depth == 0:
+            if depth == 0:
+                self.depthLimitReached = True
             #We always return an array of the static score, and the move done to reach it from one not up in the tree
-            return [gameState.getScore(),None]
-        else: 
-            if agentIndex == 0:
-                #maxEval = -2**10 #- inf, so that every iteration will always find one of the legal moves best
-                legalMoves = gameState.getLegalActions(agentIndex)
-                #We want to chose the first branch as best branch in the first iteration every time, and then see if any other alternatives
-                #are better
-                count = 0
-                for action in legalMoves:
-                    #generate new gamestate identiacal, but with pacman moved in action direction
-                    newGameState = gameState.generateSuccessor(agentIndex, action) 
-                    #If the next layer in the minmax tree are the leafnodes, we check for win and loss with assigning a huge number
-                    #as win, and a small number as loss.
-                    Eval = self.minmax(depth, agentIndex + 1, newGameState)
-                    if count == 0:
-                        maxEval = Eval[0]
-                        corresponding_action = action
+            return [self.evaluationFunction(gameState),None]
+        table = self.transpositionTable
+        if table is not None:
+            #Minimax values are always exact, so any stored entry can be returned directly
+            key = self.stateKey(gameState, agentIndex, depth, foodMask)
+            entry = table.lookup(key)
+            if entry is not None:
+                if self.pvTable is not None:
+                    #The stored subtree may have been cut by the depth limit, so keep deepening
+                    self.pvTable[ply] = [entry[2]]
+                    self.depthLimitReached = True
+                return [entry[0], entry[2]]
+        best_move = self.minmaxChildren(depth, agentIndex, gameState, numAgents, foodMask)
+        if table is not None:
+            table.store(key, best_move[0], table.EXACT, best_move[1])
+        return best_move
+
+    def minmaxChildren(self, depth, agentIndex, gameState, numAgents, foodMask):
+        #Expands one node of the minmax tree, the table lookups are done in minmax
+        if agentIndex == 0:
+            #maxEval = -2**10 #- inf, so that every iteration will always find one of the legal moves best
+            legalMoves = gameState.getLegalActions(agentIndex)
+            if self.profiler is not None:
+                self.profileNode(depth, agentIndex, numAgents, len(legalMoves))
+            #We want to chose the first branch as best branch in the first iteration every time, and then see if any other alternatives
+            #are better
+            count = 0
+            for action in legalMoves:
+                #generate new gamestate identiacal, but with pacman moved in action direction
+                newGameState = gameState.generateSuccessor(agentIndex, action) 
+                self.nodesExpanded += 1
+                #If the next layer in the minmax tree are the leafnodes, we check for win and loss with assigning a huge number
+                #as win, and a small number as loss.
+                Eval = self.minmax(depth, agentIndex + 1, newGameState,
+                                   foodMask = self.childFoodMask(agentIndex, newGameState, foodMask))
+                if count == 0 or maxEval<Eval[0]:
                     ###We choose the smallest evaluation from the ghosts below
-                    elif maxEval<Eval[0]:
-                        maxEval = Eval[0]
-                        corresponding_action = action
-                    count +=1
-                return [maxEval,corresponding_action]
-            else:
-                #minEval = 2**10
-                legalMoves = gameState.getLegalActions(agentIndex)
-                count = 0
-                for action in legalMoves:
-                    #generate new gamestate identiacal, but with the ghost moved in action direction
-                    newGameState = gameState.generateSuccessor(agentIndex, action) 
-                    #Does not go one layer down in the tree before all ghosts have moved
-                    #, and then goes to the next agent(and back to packman at mod numAgents)
-                    #Goes down 1 depth each time we go back to packman
-                    if (agentIndex + 1)%numAgents == 0:
-                        Eval = self.minmax(depth - 1, 0, newGameState)
-                    else:
-                        Eval = self.minmax(depth, agentIndex + 1, newGameState)
-                    if count == 0:
-                        minEval = Eval[0]
-                        corresponding_action = action
-                    elif minEval>Eval[0]:
-                        minEval = Eval[0]
-                        corresponding_action = action
-                    count += 1
-                
-                return [minEval, corresponding_action]
+                    maxEval = Eval[0]
+                    corresponding_action = action
+                    if self.pvTable is not None:
+                        self.updatePV(depth, agentIndex, numAgents, action)
+                count +=1
+            return [maxEval,corresponding_action]
+        else:
+            #minEval = 2**10
+            legalMoves = gameState.getLegalActions(agentIndex)
+            if self.profiler is not None:
+                self.profileNode(depth, agentIndex, numAgents, len(legalMoves))
+            if self.batchEvaluation is not None and depth == 1 and agentIndex == numAgents - 1:
+                #All the children are leaves, so evaluate them together
+                values = self.leafValues(gameState, agentIndex, numAgents, legalMoves)
+                index = int(np.argmin(values))
+                if self.pvTable is not None:
+                    self.updatePV(depth, agentIndex, numAgents, legalMoves[index])
+                return [float(values[index]), legalMoves[index]]
+            count = 0
+            for action in legalMoves:
+                #generate new gamestate identiacal, but with the ghost moved in action direction
+                newGameState = gameState.generateSuccessor(agentIndex, action) 
+                self.nodesExpanded += 1
+                #Does not go one layer down in the tree before all ghosts have moved
+                #, and then goes to the next agent(and back to packman at mod numAgents)
+                #Goes down 1 depth each time we go back to packman
+                if (agentIndex + 1)%numAgents == 0:
+                    Eval = self.minmax(depth - 1, 0, newGameState, foodMask = foodMask)
+                else:
+                    Eval = self.minmax(depth, agentIndex + 1, newGameState, foodMask = foodMask)
+                if count == 0 or minEval>Eval[0]:
+                    minEval = Eval[0]
+                    corresponding_action = action
+                    if self.pvTable is not None:
+                        self.updatePV(depth, agentIndex, numAgents, action)
+                count += 1
+            
+            return [minEval, corresponding_action]
 
     def getAction(self, gameState):
         """
@@ -188,84 +1062,198 @@ class MinimaxAgent(MultiAgentSearchAgent):
         """
         "*** YOUR CODE HERE ***"
         #util.raiseNotDefined()
-        return self.minmax(self.depth,0,gameState)[1]
+        self.newSearch(gameState)
+        if self.lightState:
+            return self.lightSearch(SearchState(gameState), self.depth, 0, -2**16, 2**16)[1]
+        foodMask = self.rootFoodMask(gameState) if self.transpositionTable is not None else None
+        if self.timeLimit > 0:
+            return self.iterativeDeepening(lambda depth: self.minmax(depth, 0, gameState, foodMask = foodMask))
+        if self.workers > 0:
+            return self.parallelSearch(gameState, foodMask)
+        return self.minmax(self.depth,0,gameState, foodMask = foodMask)[1]
+
+    def rootChildValue(self, newGameState, alpha, foodMask):
+        #Value of the state after one root move of pacman, used by the parallel search. Minimax has no alpha to use
+        return self.minmax(self.depth, 1, newGameState, foodMask = foodMask)[0]
 
   
 class AlphaBetaAgent(MultiAgentSearchAgent):
     """
     Your minimax agent with alpha-beta pruning (question 3)
     """
+    def __init__(self, *args, **kwargs):
+        MultiAgentSearchAgent.__init__(self, *args, **kwargs)
+        self.prunes = True
+
+    def rootChildValue(self, newGameState, alpha, foodMask):
+        #Value of the state after one root move of pacman, used by the parallel search
+        return self.alphaBeta(self.depth, 1, newGameState, alpha, 2**16, foodMask = foodMask)[0]
+
     def getAction(self, gameState):
         """
         Returns the minimax action using self.depth and self.evaluationFunction
         """
         "*** YOUR CODE HERE ***"
-        return self.alphaBeta(self.depth,0,gameState, alpha = -2**16, beta = 2**16)[1]
+        self.newSearch(gameState)
+        if self.lightState:
+            return self.lightSearch(SearchState(gameState), self.depth, 0, -2**16, 2**16)[1]
+        foodMask = self.rootFoodMask(gameState) if self.transpositionTable is not None else None
+        if self.timeLimit > 0:
+            return self.iterativeDeepening(lambda depth: self.alphaBeta(depth, 0, gameState, alpha = -2**16, beta = 2**16,
+                                                                        foodMask = foodMask))
+        if self.workers > 0:
+            return self.parallelSearch(gameState, foodMask)
+        return self.alphaBeta(self.depth,0,gameState, alpha = -2**16, beta = 2**16, foodMask = foodMask)[1]
         #util.raiseNotDefined()
 
-    def alphaBeta(self, depth,agentIndex,gameState,alpha,beta,maximAgent = 0):
+    def alphaBeta(self, depth,agentIndex,gameState,alpha,beta,maximAgent = 0, foodMask = None):
         numAgents = gameState.getNumAgents()
+        if self.pvTable is not None:
+            ply = self.enterNode(depth, agentIndex, numAgents)
         #If the gamestate is winning, loosing or the depth is zero we don't create new branches, but we to static evaluations instead
         if gameState.isLose() or gameState.isWin() or depth == 0:
-            return [gameState.getScore(),None]
-        else: 
-            if agentIndex == 0:
-                maxEval, corresponding_action = -2**16, None #- inf, so that every iteration will always find one of the legal moves best
-                #We want to chose the first branch as best branch in the first iteration every time, and then see if any other alternatives
-                #are better
-                #Creating a new branch for each legal move
-                for action in gameState.getLegalActions(agentIndex):
-                    #generate new gamestate identiacal, but with pacman moved in action direction
-                    newGameState = gameState.generateSuccessor(agentIndex, action) 
-                    #If the next layer in the minmax tree are the leafnodes, we check for win and loss with assigning a huge number
-                    #as win, and a small number as loss.
-                    Eval = self.alphaBeta(depth, agentIndex + 1, newGameState, alpha, beta)
-                    ###We choose the smallest evaluation from the ghosts below
-                    if maxEval<Eval[0]:
-                        maxEval = Eval[0]
-                        corresponding_action = action
-                        # alpha = max(alpha,maxEval)
-                    ###Pruning part, here we prune of the branches the instant they can't be the maximized path
-                    # alpha = max(alpha,maxEval)
-                    if maxEval > beta:
-                        return [maxEval,corresponding_action]
-                    alpha = max(alpha,maxEval)
-                    best_move = [maxEval, corresponding_action]
-            else:
-                minEval, corresponding_action = 2**16, None
-                #Checking if next agent is pacman or ghost outside of the loop to avoid needless computations.
-                if (agentIndex + 1)%numAgents == 0:
-                    depth -= 1
-                    agentIndex = -1
-                    
-                for action in gameState.getLegalActions(agentIndex):
-                    #generate new gamestate identiacal, but with the ghost moved in action direction
-                    newGameState = gameState.generateSuccessor(agentIndex, action) 
-                    #Does not go one layer down in the tree before all ghosts have moved
-                    #, and then goes to the next agent(and back to packman at mod numAgents)
-                    #Goes down 1 depth each time we go back to packman
-                    # if (agentIndex + 1)%numAgents == 0:
-                    #     Eval = self.alphaBeta(depth - 1, 0, newGameState, alpha, beta)
-                    # else:
-                    #     Eval = self.alphaBeta(depth, agentIndex + 1, newGameState, alpha, beta)
-                    Eval = self.alphaBeta(depth, agentIndex + 1, newGameState, alpha, beta)
-                    if minEval > Eval[0]:
-                        minEval = Eval[0]
-                        corresponding_action = action
-                        # beta = min(beta,minEval)
-                    
-                    ###Pruning part
-                    # beta = min(beta,minEval)
-                    if minEval < alpha:
-                        return [minEval, corresponding_action]
-                    beta = min(beta,minEval)
-                    best_move = [minEval, corresponding_action]
-            return best_move
+            if depth == 0:
+                self.depthLimitReached = True
+            return [self.evaluationFunction(gameState),None]
+        if self.transpositionTable is not None:
+            key = self.stateKey(gameState, agentIndex, depth, foodMask)
+            stored = self.probeTable(key, alpha, beta)
+            if stored is not None:
+                if self.pvTable is not None:
+                    #The stored subtree may have been cut by the depth limit, so keep deepening
+                    self.pvTable[ply] = [stored[1]]
+                    self.depthLimitReached = True
+                return stored
+        best_move = self.alphaBetaChildren(depth, agentIndex, gameState, alpha, beta, numAgents, foodMask)
+        if self.transpositionTable is not None:
+            #In a worker the pacman nodes below may have searched with a higher alpha, below that it is only a bound
+            self.storeTable(key, best_move, max(alpha, self.alphaFloor), beta)
+        return best_move
+
+    def alphaBetaChildren(self, depth, agentIndex, gameState, alpha, beta, numAgents, foodMask):
+        #Expands one node of the alpha-beta tree, the table lookups are done in alphaBeta
+        if agentIndex == 0:
+            maxEval, corresponding_action = -2**16, None #- inf, so that every iteration will always find one of the legal moves best
+            #We want to chose the first branch as best branch in the first iteration every time, and then see if any other alternatives
+            #are better
+            #Creating a new branch for each legal move
+            ply = (self.searchDepth - depth) * numAgents + agentIndex
+            legalMoves = self.moveOrdering.orderMoves(gameState, agentIndex, ply, gameState.getLegalActions(agentIndex))
+            if self.followPV:
+                legalMoves = self.orderPV(ply, legalMoves)
+            if self.profiler is not None:
+                self.profiler.expand(ply, len(legalMoves))
+            for action in legalMoves:
+                if self.alphaSource is not None:
+                    alpha = self.raiseAlpha(alpha)
+                #generate new gamestate identiacal, but with pacman moved in action direction
+                newGameState = gameState.generateSuccessor(agentIndex, action) 
+                self.nodesExpanded += 1
+                #If the next layer in the minmax tree are the leafnodes, we check for win and loss with assigning a huge number
+                #as win, and a small number as loss.
+                Eval = self.alphaBeta(depth, agentIndex + 1, newGameState, alpha, beta,
+                                      foodMask = self.childFoodMask(agentIndex, newGameState, foodMask))
+                #Only the first child of a node on the principal variation is on it as well
+                self.followPV = False
+                ###We choose the smallest evaluation from the ghosts below
+                if maxEval<Eval[0]:
+                    maxEval = Eval[0]
+                    corresponding_action = action
+                    if self.pvTable is not None:
+                        self.updatePV(depth, agentIndex, numAgents, action)
+                ###Pruning part, here we prune of the branches the instant they can't be the maximized path
+                if maxEval > beta:
+                    self.cutoffs += 1
+                    self.moveOrdering.recordCutoff(gameState, agentIndex, ply, depth, action)
+                    return [maxEval,corresponding_action]
+                alpha = max(alpha,maxEval)
+                best_move = [maxEval, corresponding_action]
+        else:
+            minEval, corresponding_action = 2**16, None
+            #Checking if next agent is pacman or ghost outside of the loop to avoid needless computations.
+            nextDepth, nextAgent = depth, agentIndex + 1
+            if nextAgent == numAgents:
+                nextDepth, nextAgent = depth - 1, 0
+                
+            ply = (self.searchDepth - depth) * numAgents + agentIndex
+            legalMoves = self.moveOrdering.orderMoves(gameState, agentIndex, ply, gameState.getLegalActions(agentIndex))
+            if self.followPV:
+                legalMoves = self.orderPV(ply, legalMoves)
+            if self.profiler is not None:
+                self.profiler.expand(ply, len(legalMoves))
+            for action in legalMoves:
+                #generate new gamestate identiacal, but with the ghost moved in action direction
+                newGameState = gameState.generateSuccessor(agentIndex, action) 
+                self.nodesExpanded += 1
+                #Does not go one layer down in the tree before all ghosts have moved
+                #, and then goes to the next agent(and back to packman at mod numAgents)
+                #Goes down 1 depth each time we go back to packman
+                Eval = self.alphaBeta(nextDepth, nextAgent, newGameState, alpha, beta, foodMask = foodMask)
+                self.followPV = False
+                if minEval > Eval[0]:
+                    minEval = Eval[0]
+                    corresponding_action = action
+                    if self.pvTable is not None:
+                        self.updatePV(depth, agentIndex, numAgents, action)
+                
+                ###Pruning part
+                if minEval < alpha:
+                    self.cutoffs += 1
+                    self.moveOrdering.recordCutoff(gameState, agentIndex, ply, depth, action)
+                    return [minEval, corresponding_action]
+                beta = min(beta,minEval)
+                best_move = [minEval, corresponding_action]
+        return best_move
+
+def scoreBounds(gameState, pacmanMoves):
+    """
+    Lowest and highest score the game can have after pacmanMoves more moves of
+    pacman, from the scoring in pacman.py: every move costs 1 and eats at most
+    one pellet (+10), all the food gone is a win (+500), a ghost reaching pacman
+    a loss (-500), and a ghost is only eaten (+200) while scared.
+
+    The win and loss are only counted when they can happen this soon, the food
+    has to be few enough to eat in time, and a ghost close enough that pacman
+    and the ghost together can close the distance in the moves left.
+    """
+    score = gameState.getScore()
+    pacmanPos = gameState.getPacmanPosition()
+    numFood = gameState.getNumFood()
+    reach = 2 * pacmanMoves + 2
+    ghostStates = gameState.getGhostStates()
+    nearGhosts = [ghost for ghost in ghostStates if manhattanDistance(ghost.getPosition(), pacmanPos) <= reach]
+    foodEaten = min(pacmanMoves, numFood)
+    ghostsEaten = len([ghost for ghost in nearGhosts if ghost.scaredTimer > 0]) + \
+                  len(ghostStates) * min(pacmanMoves, len(gameState.getCapsules()))
+    lower = score - pacmanMoves - (500 if nearGhosts else 0)
+    upper = score + 9 * foodEaten + (500 if numFood <= pacmanMoves else 0) + 200 * ghostsEaten
+    return lower, upper
 
 class ExpectimaxAgent(MultiAgentSearchAgent):
     """
       Your expectimax agent (question 4)
+
+      The ghosts are chance nodes that pick uniformly among their legal moves.
+      Besides the options every MultiAgentSearchAgent has (depth, timeLimit,
+      ttSize to memoize the chance node averages, workers), it takes:
+
+      pruning=1  Star1 pruning of the chance nodes.  It needs bounds on the
+                 evaluation function, given with minEval/maxEval, or worked out
+                 from the scoring rules for scoreEvaluationFunction.
+
+      Pacman is the only max player, so beta never gets below infinity and only
+      the alpha side of Star1 prunes anything.  For the same reason Star2 would
+      not help, its probing only gives lower bounds for beta cutoffs.
     """
+    def __init__(self, evalFn = 'scoreEvaluationFunction', depth = '2', pruning = '0', minEval = None, maxEval = None, **kwargs):
+        MultiAgentSearchAgent.__init__(self, evalFn, depth, **kwargs)
+        if self.lightState:
+            raise ValueError('lightState=1 is only supported by MinimaxAgent and AlphaBetaAgent')
+        self.agentArgs.update(pruning = pruning, minEval = minEval, maxEval = maxEval)
+        self.prunes = bool(int(pruning))
+        self.evalRange = None
+        if minEval is not None and maxEval is not None:
+            self.evalRange = (float(minEval), float(maxEval))
 
     def getAction(self, gameState):
         """
@@ -275,21 +1263,371 @@ class ExpectimaxAgent(MultiAgentSearchAgent):
         legal moves.
         """
         "*** YOUR CODE HERE ***"
-        util.raiseNotDefined()
-        
+        self.newSearch(gameState)
+        foodMask = self.rootFoodMask(gameState) if self.transpositionTable is not None else None
+        if self.timeLimit > 0:
+            return self.iterativeDeepening(lambda depth: self.expectimax(depth, 0, gameState, -2**16, 2**16, foodMask = foodMask))
+        if self.workers > 0:
+            return self.parallelSearch(gameState, foodMask)
+        return self.expectimax(self.depth, 0, gameState, -2**16, 2**16, foodMask = foodMask)[1]
+
+    def rootChildValue(self, newGameState, alpha, foodMask):
+        #Value of the state after one root move of pacman, used by the parallel search
+        return self.expectimax(self.depth, 1, newGameState, alpha, 2**16, foodMask = foodMask)[0]
+
+    def evaluationBounds(self, gameState, depth, agentIndex):
+        #Bounds on every leaf below this node, or None when we don't know any and can't prune
+        if self.evalRange is not None:
+            return self.evalRange
+        if self.evaluationFunction is scoreEvaluationFunction:
+            return scoreBounds(gameState, depth if agentIndex == 0 else depth - 1)
+        return None
+
+    def expectimax(self, depth, agentIndex, gameState, alpha, beta, foodMask = None):
+        """
+        Returns [value, action] like alphaBeta.  Without pruning the window is
+        always the full one and every value is exact, with pruning a value below
+        alpha is an upper bound and one above beta a lower bound.
+        """
+        numAgents = gameState.getNumAgents()
+        if self.pvTable is not None:
+            ply = self.enterNode(depth, agentIndex, numAgents)
+        if gameState.isLose() or gameState.isWin() or depth == 0:
+            if depth == 0:
+                self.depthLimitReached = True
+            return [self.evaluationFunction(gameState), None]
+        if self.transpositionTable is not None:
+            key = self.stateKey(gameState, agentIndex, depth, foodMask)
+            stored = self.probeTable(key, alpha, beta)
+            if stored is not None:
+                if self.pvTable is not None:
+                    self.pvTable[ply] = [stored[1]] if stored[1] is not None else []
+                    self.depthLimitReached = True
+                return stored
+        if agentIndex == 0:
+            best_move = self.maxChildren(depth, gameState, alpha, beta, numAgents, foodMask)
+        else:
+            best_move = self.chanceChildren(depth, agentIndex, gameState, alpha, beta, numAgents, foodMask)
+        if self.transpositionTable is not None:
+            self.storeTable(key, best_move, alpha, beta)
+        return best_move
+
+    def maxChildren(self, depth, gameState, alpha, beta, numAgents, foodMask):
+        maxEval, corresponding_action = -2**16, None
+        ply = (self.searchDepth - depth) * numAgents
+        legalMoves = self.moveOrdering.orderMoves(gameState, 0, ply, gameState.getLegalActions(0))
+        if self.followPV:
+            legalMoves = self.orderPV(ply, legalMoves)
+        if self.profiler is not None:
+            self.profiler.expand(ply, len(legalMoves))
+        for action in legalMoves:
+            newGameState = gameState.generateSuccessor(0, action)
+            self.nodesExpanded += 1
+            Eval = self.expectimax(depth, 1, newGameState, alpha, beta, foodMask = self.childFoodMask(0, newGameState, foodMask))
+            self.followPV = False
+            if maxEval < Eval[0]:
+                maxEval = Eval[0]
+                corresponding_action = action
+                if self.pvTable is not None:
+                    self.updatePV(depth, 0, numAgents, action)
+            if maxEval > beta:
+                self.cutoffs += 1
+                self.moveOrdering.recordCutoff(gameState, 0, ply, depth, action)
+                return [maxEval, corresponding_action]
+            alpha = max(alpha, maxEval)
+        return [maxEval, corresponding_action]
+
+    def chanceChildren(self, depth, agentIndex, gameState, alpha, beta, numAgents, foodMask):
+        nextDepth, nextAgent = depth, agentIndex + 1
+        if nextAgent == numAgents:
+            nextDepth, nextAgent = depth - 1, 0
+        legalMoves = gameState.getLegalActions(agentIndex)
+        n = len(legalMoves)
+        if self.profiler is not None:
+            self.profileNode(depth, agentIndex, numAgents, n)
+        bounds = self.evaluationBounds(gameState, depth, agentIndex) if self.prunes else None
+        if bounds is None and self.batchEvaluation is not None and nextDepth == 0:
+            #All the children are leaves, so evaluate them together
+            return [float(np.mean(self.leafValues(gameState, agentIndex, numAgents, legalMoves))), None]
+        total = 0.0
+        for i, action in enumerate(legalMoves):
+            newGameState = gameState.generateSuccessor(agentIndex, action)
+            self.nodesExpanded += 1
+            if bounds is None:
+                total += self.expectimax(nextDepth, nextAgent, newGameState, -2**16, 2**16, foodMask = foodMask)[0]
+                continue
+            #Star1: the children not searched yet are somewhere between lower and upper, so this child only
+            #has to be searched as far as it can still move the average across alpha or beta
+            lower, upper = bounds
+            rest = n - i - 1
+            childAlpha = max(n * alpha - total - rest * upper, lower)
+            childBeta = min(n * beta - total - rest * lower, upper)
+            value = self.expectimax(nextDepth, nextAgent, newGameState, childAlpha, childBeta, foodMask = foodMask)[0]
+            total += value
+            if value < childAlpha or total + rest * upper < n * alpha:
+                self.cutoffs += 1
+                return [(total + rest * upper) / n, None]
+            if value > childBeta or total + rest * lower > n * beta:
+                self.cutoffs += 1
+                return [(total + rest * lower) / n, None]
+        return [total / n, None]
+
+class MazeDistances:
+    """
+    True maze distances between every pair of open cells of one layout, kept
+    as an int16 matrix over the open cells only.  index maps cell (x, y), flat
+    index x*height + y, to its row, walls map to -1.  Cells that can't reach
+    each other are UNREACHABLE apart.
+
+    The matrix is filled with one breadth first search that starts from every
+    open cell at the same time, each step moves all the frontiers one cell
+    with numpy shifts.  It is saved in cacheDirectory under a hash of the
+    walls, so later runs on the same layout just load it.  loadTime and
+    fromDisk tell how long getting the table took and where it came from.
+    """
+    UNREACHABLE = 10**4
+    cacheDirectory = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mazeDistanceCache')
+
+    def __init__(self, walls, useDiskCache = True):
+        start = time.time()
+        self.width, self.height = walls.width, walls.height
+        isOpen = ~np.array(walls.data, dtype = bool)
+        self.openCells = np.flatnonzero(isOpen)
+        self.index = np.full(self.width * self.height, -1, dtype = np.int32)
+        self.index[self.openCells] = np.arange(len(self.openCells))
+        self.indexList = self.index.tolist()
+        self.layoutHash = self.layoutKey(walls)
+        path = os.path.join(self.cacheDirectory, self.layoutHash + '.npy')
+        self.fromDisk = useDiskCache and os.path.exists(path)
+        if self.fromDisk:
+            self.distances = np.load(path)
+        else:
+            self.distances = self.allPairsDistances(isOpen)
+            if useDiskCache:
+                self.save(path)
+        self.loadTime = time.time() - start
+
+    @staticmethod
+    def layoutKey(walls):
+        #Hash of the wall layout, the same for equal walls even when they are different grid objects
+        isOpen = ~np.array(walls.data, dtype = bool)
+        return hashlib.sha1(np.array(isOpen.shape).tobytes() + np.packbits(isOpen).tobytes()).hexdigest()[:20]
+
+    def allPairsDistances(self, isOpen):
+        numOpen = len(self.openCells)
+        distances = np.full((numOpen, self.width, self.height), self.UNREACHABLE, dtype = np.int16)
+        frontier = np.zeros((numOpen, self.width, self.height), dtype = bool)
+        frontier[np.arange(numOpen), self.openCells // self.height, self.openCells % self.height] = True
+        reached = frontier.copy()
+        step = 0
+        while frontier.any():
+            distances[frontier] = step
+            neighbours = np.zeros_like(frontier)
+            neighbours[:, 1:, :] |= frontier[:, :-1, :]
+            neighbours[:, :-1, :] |= frontier[:, 1:, :]
+            neighbours[:, :, 1:] |= frontier[:, :, :-1]
+            neighbours[:, :, :-1] |= frontier[:, :, 1:]
+            frontier = neighbours & isOpen & ~reached
+            reached |= frontier
+            step += 1
+        return np.ascontiguousarray(distances.reshape(numOpen, -1)[:, self.openCells])
+
+    def save(self, path):
+        #Written to a temporary name first so a run that is killed halfway can't leave a broken table behind
+        try:
+            if not os.path.isdir(self.cacheDirectory):
+                os.makedirs(self.cacheDirectory)
+            np.save(path + '.tmp.npy', self.distances)
+            os.replace(path + '.tmp.npy', path)
+        except OSError:
+            pass
+
+    def cellIndex(self, pos):
+        #Scared ghosts move half a cell at a time, they count as being in the closest cell
+        return self.indexList[int(pos[0] + 0.5) * self.height + int(pos[1] + 0.5)]
+
+    def getDistance(self, pos1, pos2):
+        return int(self.distances[self.cellIndex(pos1), self.cellIndex(pos2)])
+
+    def memoryUsage(self):
+        #Bytes used by the distance matrix and the cell index
+        return self.distances.nbytes + self.index.nbytes
+
+#Distance tables kept in memory, keyed on the layout hash, and the last one used so looking it up is only an
+#identity check as long as the walls grid object stays the same
+mazeDistanceCache = {}
+lastMazeDistances = None
+
+def getMazeDistances(gameState):
+    """
+    The MazeDistances of the layout gameState is played on, built or loaded
+    from disk the first time a layout is seen.  Any evaluation function can use
+    it, getDistance is a table lookup.
+    """
+    global lastMazeDistances
+    walls = gameState.getWalls()
+    if lastMazeDistances is None or lastMazeDistances[0] is not walls:
+        #Several games on different layouts can take turns here, so only hash the walls and never reload a table
+        #that is already in memory
+        key = MazeDistances.layoutKey(walls)
+        if key not in mazeDistanceCache:
+            mazeDistanceCache[key] = MazeDistances(walls)
+        lastMazeDistances = (walls, mazeDistanceCache[key])
+    return lastMazeDistances[1]
+
+def reportMazeDistances(layoutNames = ('mediumClassic', 'openClassic', 'trickyClassic', 'originalClassic')):
+    """
+    Prints, for each layout, the time to build the distance table, the time to
+    load it from the disk cache and the memory it takes.
+
+    python3 -c "import multiAgents; multiAgents.reportMazeDistances()"
+    """
+    import layout
+    print('%-16s %7s %6s %10s %10s %10s' % ('layout', 'size', 'open', 'build ms', 'load ms', 'memory kB'))
+    for name in layoutNames:
+        walls = layout.getLayout(name).walls
+        built = MazeDistances(walls, useDiskCache = False)
+        built.save(os.path.join(MazeDistances.cacheDirectory, built.layoutHash + '.npy'))
+        loaded = MazeDistances(walls)
+        print('%-16s %7s %6d %10.1f %10.1f %10.1f' % (name, '%dx%d' % (walls.width, walls.height), len(built.openCells),
+                                                   built.loadTime * 1000, loaded.loadTime * 1000, loaded.memoryUsage() / 1024.0))
+
+class FeatureEvaluator:
+    """
+    The evaluation behind betterEvaluationFunction, written to score many
+    states at once: evaluateBatch turns the food grids, pacman, ghost and
+    capsule positions of all the states into numpy arrays and computes every
+    feature for all of them together, with maze distances from MazeDistances.
+
+    value = score - 1.5 * distance to the closest food - 20 * capsules left
+            - 10 / distance for every ghost that isn't scared (-200 if it is next to pacman)
+            + 50 / (distance + 1) for every scared ghost pacman can reach in time
+    """
+    FOOD_WEIGHT = 1.5
+    CAPSULE_WEIGHT = 20.0
+    GHOST_WEIGHT = 10.0
+    GHOST_ADJACENT_PENALTY = 200.0
+    SCARED_WEIGHT = 50.0
+
+    def evaluate(self, gameState):
+        return float(self.evaluateBatch([gameState])[0])
+
+    def evaluateBatch(self, gameStates):
+        maze = getMazeDistances(gameStates[0])
+        numStates = len(gameStates)
+        scores = np.array([gameState.getScore() for gameState in gameStates])
+        pacman = np.array([maze.cellIndex(gameState.getPacmanPosition()) for gameState in gameStates])
+        #Distance from every pacman to every cell, one row per state
+        fromPacman = maze.distances[pacman]
+
+        #Only the open cells, so it lines up with the rows of the distance table
+        food = np.array([gameState.getFood().data for gameState in gameStates], dtype = bool).reshape(numStates, -1)[:, maze.openCells]
+        foodDistance = np.where(food, fromPacman, maze.UNREACHABLE).min(axis = 1)
+        foodDistance[~food.any(axis = 1)] = 0
+        capsules = np.array([len(gameState.getCapsules()) for gameState in gameStates])
+
+        ghosts = np.array([[maze.cellIndex(ghost.getPosition()) for ghost in gameState.getGhostStates()] for gameState in gameStates],
+                          dtype = int).reshape(numStates, -1)
+        scared = np.array([[ghost.scaredTimer for ghost in gameState.getGhostStates()] for gameState in gameStates],
+                          dtype = int).reshape(numStates, -1)
+        ghostDistance = np.take_along_axis(fromPacman, ghosts, axis = 1).astype(float)
+        active = scared == 0
+        danger = np.where(active, self.GHOST_WEIGHT / np.maximum(ghostDistance, 0.5), 0).sum(axis = 1)
+        danger += np.where(active & (ghostDistance <= 1), self.GHOST_ADJACENT_PENALTY, 0).sum(axis = 1)
+        hunt = np.where(scared > ghostDistance, self.SCARED_WEIGHT / (ghostDistance + 1), 0).sum(axis = 1)
+
+        return scores - self.FOOD_WEIGHT * foodDistance - self.CAPSULE_WEIGHT * capsules - danger + hunt
+
+featureEvaluator = FeatureEvaluator()
 
 def betterEvaluationFunction(currentGameState):
     """
     Your extreme ghost-hunting, pellet-nabbing, food-gobbling, unstoppable
     evaluation function (question 5).
 
-    DESCRIPTION: <write something here so we know what you did>
+    DESCRIPTION: The game score, minus the maze distance to the closest food
+    and the capsules left, minus a penalty for being close to ghosts that are
+    not scared, plus a bonus for scared ghosts pacman can catch before they
+    stop being scared.  See FeatureEvaluator for the weights, it also scores
+    many states in one go, which the searchers use for the last ply.
     """
     "*** YOUR CODE HERE ***"
-    util.raiseNotDefined()
+    return featureEvaluator.evaluate(currentGameState)
+
+#Searchers look for this to evaluate all the leaves below a node with one call
+betterEvaluationFunction.batch = featureEvaluator.evaluateBatch
 
 # Abbreviation
 better = betterEvaluationFunction
+
+def recordGameStates(layoutName, numMoves, agent, seed = 0):
+    """
+    Plays numMoves moves of a game on layoutName, pacman moved by agent and the
+    ghosts at random, and returns the states pacman had to move in.  Used by the
+    benchmarks below so every configuration is timed on the same positions.
+    """
+    import layout, pacman
+    rng = random.Random(seed)
+    gameState = pacman.GameState()
+    gameState.initialize(layout.getLayout(layoutName), 2)
+    states = []
+    while len(states) < numMoves and not (gameState.isWin() or gameState.isLose()):
+        states.append(gameState)
+        gameState = gameState.generateSuccessor(0, agent.getAction(gameState))
+        for ghost in range(1, gameState.getNumAgents()):
+            if gameState.isWin() or gameState.isLose():
+                break
+            gameState = gameState.generateSuccessor(ghost, rng.choice(gameState.getLegalActions(ghost)))
+    return states
+
+def benchmarkParallelSearch(layoutName = 'mediumClassic', depth = '4', workerCounts = (1, 2, 4, 8), numMoves = 10,
+                            agentType = 'AlphaBetaAgent'):
+    """
+    Times the parallel root split for every worker count against the serial
+    search on the same states, and checks that they all pick the same moves.
+
+    python3 -c "import multiAgents; multiAgents.benchmarkParallelSearch()"
+    """
+    agentClass = util.lookup(agentType, globals())
+    serial = agentClass(depth = depth)
+    states = recordGameStates(layoutName, numMoves, serial)
+    start = time.time()
+    serialMoves = [serial.getAction(gameState) for gameState in states]
+    serialTime = time.time() - start
+    print('%-8s %9s %8s %6s' % ('workers', 'seconds', 'speedup', 'same'))
+    print('%-8s %9.3f %8.2f %6s' % ('serial', serialTime, 1.0, True))
+    for workers in workerCounts:
+        agent = agentClass(depth = depth, workers = str(workers))
+        #The first move also starts the pool, so do one untimed move before
+        agent.getAction(states[0])
+        start = time.time()
+        moves = [agent.getAction(gameState) for gameState in states]
+        elapsed = time.time() - start
+        agent.final(None)
+        print('%-8d %9.3f %8.2f %6s' % (workers, elapsed, serialTime / elapsed, moves == serialMoves))
+
+def benchmarkLightState(layoutName = 'mediumClassic', depth = '3', numMoves = 10, agentType = 'AlphaBetaAgent'):
+    """
+    Nodes per second of the search on GameState successors against the
+    search on a SearchState with make/unmake, on the same states, and checks
+    that both pick the same moves.
+
+    python3 -c "import multiAgents; multiAgents.benchmarkLightState()"
+    """
+    agentClass = util.lookup(agentType, globals())
+    states = recordGameStates(layoutName, numMoves, agentClass(depth = depth))
+    print('%-10s %9s %10s %12s %6s' % ('state', 'seconds', 'nodes', 'nodes/sec', 'same'))
+    baseline = None
+    for lightState in ('0', '1'):
+        agent = agentClass(depth = depth, lightState = lightState)
+        start = time.time()
+        moves = [agent.getAction(gameState) for gameState in states]
+        elapsed = time.time() - start
+        nodes = agent.totalNodesExpanded + agent.nodesExpanded
+        if baseline is None:
+            baseline = moves
+        print('%-10s %9.3f %10d %12.0f %6s' % ('light' if lightState == '1' else 'GameState', elapsed, nodes,
+                                              nodes / elapsed, moves == baseline))
 #   python3 autograder.py -q q2
 #   python3 autograder.py -q q2 --no-graphics
 #   python3 autograder.py -q q3